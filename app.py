@@ -5,24 +5,118 @@ import threading
 import time
 import sys
 import os
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 import threading
 import time
+import gzip
+import json
+import itertools
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from contextlib import contextmanager
 from werkzeug.utils import secure_filename
 
+# Brotli is optional - responses fall back to gzip when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from thumbnail_cache import ThumbnailCache
+from profiling import Profiler
+from job_trace import JobTrace
+from sync_subscriptions import SyncManager
+from media_library import MediaLibrary
+
 # Import backend functions
 try:
-    from backend import get_video_info, get_available_formats, get_downloadable_video_formats, download_video, download_audio, download_audio_raw
+    from backend import (get_video_info, get_available_formats, get_downloadable_video_formats,
+                         compact_formats, compact_playlist_entry, download_video, download_audio,
+                         download_audio_raw, format_with_fallback, is_valid_youtube_url, is_single_video_url,
+                         ydl_pool, video_info_cache, JobControl, estimate_download_size, disk_reservations,
+                         classify_download_error, backoff_delay, RETRYABLE_ERRORS, extraction_pool,
+                         estimate_media_size, parse_clip_range, list_entries_since, sync_listing_url,
+                         is_newest_first, iter_playlist_entries, read_ahead)
 except ImportError:
+    ydl_pool = None
+    extraction_pool = None
     # Fallback if backend not available
     def get_video_info(url): return None
+    def is_valid_youtube_url(url): return False
+    def is_single_video_url(url): return False
+    def format_with_fallback(format_id, download_type): return format_id
     def get_available_formats(info): return [], []
     def get_downloadable_video_formats(video_formats, audio_formats): return []
-    def download_video(url, format_id, path, callback): return {'success': False, 'error': 'Backend not available'}
-    def download_audio(url, format_id, path, callback): return {'success': False, 'error': 'Backend not available'}
-    def download_audio_raw(url, format_id, path, callback): return {'success': False, 'error': 'Backend not available'}
+    def compact_formats(downloadable_formats): return downloadable_formats
+    def compact_playlist_entry(entry): return entry
+    def download_video(url, format_id, path, callback, clip=None, postprocessor_callback=None, info=None): return {'success': False, 'error': 'Backend not available'}
+    def download_audio(url, format_id, path, callback, clip=None, postprocessor_callback=None, info=None): return {'success': False, 'error': 'Backend not available'}
+    def download_audio_raw(url, format_id, path, callback, clip=None, postprocessor_callback=None, info=None): return {'success': False, 'error': 'Backend not available'}
+
+    class _UncachedVideoInfo:
+        def get(self, url): return get_video_info(url)
+        def prefetch(self, url): return False
+        def peek(self, url, wait=False): return None
+    video_info_cache = _UncachedVideoInfo()
+
+    def estimate_download_size(info, format_id, extract_audio=False, clip=None): return 0
+    def estimate_media_size(info, format_id): return 0
+    def parse_clip_range(start_time, end_time): return 0.0, None
+    def list_entries_since(url, watermark=None, newest_first=True, max_entries=None, since_date=None): raise RuntimeError('Backend not available')
+    def sync_listing_url(url): return url
+    def is_newest_first(url): return True
+    def iter_playlist_entries(url, max_entries=None): raise RuntimeError('Backend not available')
+    def read_ahead(iterable, size): return iter(iterable)
+    def classify_download_error(error): return 'permanent'
+    def backoff_delay(attempt, base_delay, max_delay): return base_delay
+    RETRYABLE_ERRORS = ()
+
+    class _NoDiskReservations:
+        @contextmanager
+        def reserve(self, path, nbytes, control=None, on_hold=None): yield True
+    disk_reservations = _NoDiskReservations()
+
+    class JobControl:
+        cancelled = paused = False
+        def cancel(self): pass
+        def pause(self): pass
+        def resume(self): pass
+        def check(self, d=None): pass
+        def wait_while_paused(self): return True
+        def sleep(self, seconds): time.sleep(seconds); return True
+        def forget_files(self): pass
+        def remove_temp_files(self): pass
 
 class TubeSyncDesktop:
+    # Minimum JSON body size (bytes) before compression kicks in
+    COMPRESS_MIN_SIZE = 1024
+    # Playlist entries resolved ahead of the one currently downloading
+    PLAYLIST_PREFETCH_AHEAD = 3
+    # Listed playlist entries buffered ahead of the download loop
+    PLAYLIST_LISTING_BUFFER = 50
+    # Playlist entries sent to the UI (the list is virtualized client-side)
+    PLAYLIST_ENTRY_LIMIT = 10000
+    # Concurrent extractions and URL limit for /api/video-info/batch
+    BATCH_INFO_WORKERS = 8
+    BATCH_MAX_URLS = 1000
+    # Playlist retries: attempts per entry, backoff bounds and the pause
+    # between entries, which grows while the site is rate limiting us
+    PLAYLIST_MAX_RETRIES = 3
+    RETRY_BASE_DELAY = 5
+    RETRY_MAX_DELAY = 300
+    PLAYLIST_ITEM_DELAY = 1
+    THROTTLE_MAX_DELAY = 60
+    # Most recent retries listed in a playlist's progress (retry_count has the total)
+    PLAYLIST_RETRY_LOG = 20
+    # Per-entry outcomes of download_playlist_with_progress, stored as their index:
+    # not attempted, done, or the classify_download_error cause of the failure
+    VIDEO_OUTCOMES = ('pending', 'completed', 'throttled', 'network', 'unavailable', 'permanent')
+    VIDEO_PENDING, VIDEO_COMPLETED = 0, 1
+    # Traces of finished jobs are kept this many seconds, and at most this many
+    JOB_TRACE_TTL = 3600
+    JOB_TRACE_LIMIT = 200
+
     def __init__(self):
         self.app = Flask(__name__)
         self.app.config['SECRET_KEY'] = 'tubesync-secret-key-2024'
@@ -32,12 +126,25 @@ class TubeSyncDesktop:
         self.download_progress = {}
         self.current_downloads = {}
         self.current_download_path = 'downloads'
+        self._download_counter = itertools.count(1)
+        self.job_controls = {}  # download ID -> JobControl while the job is running
+        self.job_traces = {}  # download ID -> JobTrace timeline
         
         # Ensure downloads directory exists
         if not os.path.exists(self.current_download_path):
             os.makedirs(self.current_download_path)
         
+        # Local thumbnail cache served through /api/thumb
+        self.thumbnail_cache = ThumbnailCache()
+        self.profiler = Profiler()
+        self.sync_manager = SyncManager(list_entries_since, self.run_sync_job)
+        # Searchable index of finished downloads behind /api/library
+        self.media_library = MediaLibrary()
+        
         self.setup_routes()
+        # Registered before compression so profiled requests include it
+        self.profiler.init_app(self.app)
+        self.app.after_request(self.compress_response)
         self.flask_thread = None
         self.webview_window = None
         
@@ -61,9 +168,9 @@ class TubeSyncDesktop:
                     print("Error: No URL provided")
                     return jsonify({'error': 'URL is required'}), 400
                 
-                # Get video info
+                # Get video info (shares a prefetch already started for this URL)
                 print("Calling get_video_info...")
-                info = get_video_info(url)
+                info = video_info_cache.get(url)
                 print(f"Video info result: {info is not None}")
                 
                 if not info:
@@ -73,162 +180,56 @@ class TubeSyncDesktop:
                 print(f"Video title: {info.get('title', 'Unknown')}")
                 print(f"Video type: {info.get('_type', 'video')}")
                 
-                # Check if this is a playlist
-                is_playlist = info.get('_type') == 'playlist'
-                playlist_count = info.get('playlist_count', 0)
+                response_data, error = self.build_video_info_payload(info)
+                if error:
+                    return jsonify({'error': error}), 400
                 
-                if is_playlist:
-                    print(f"Processing playlist with {playlist_count} videos")
-                    # Handle playlist
-                    entries = info.get('entries', [])
-                    if not entries:
-                        print("Error: Playlist is empty")
-                        return jsonify({'error': 'Playlist is empty or could not be processed'}), 400
-                    
-                    # Get first video info for format reference
-                    first_video = entries[0]
-                    if not first_video:
-                        print("Error: Could not get first video from playlist")
-                        return jsonify({'error': 'Could not get first video from playlist'}), 400
-                    
-                    # Get available formats for the first video
-                    print("Getting formats for first video...")
-                    video_formats, audio_formats = get_available_formats(first_video)
-                    print(f"Found {len(video_formats)} video formats, {len(audio_formats)} audio formats")
-                    
-                    downloadable_formats = get_downloadable_video_formats(video_formats, audio_formats)
-                    print(f"Created {len(downloadable_formats)} downloadable formats")
-                    
-                    # Add pure audio formats to downloadable formats
-                    for audio_fmt in audio_formats:
-                        # Create a proper quality label for audio
-                        abr = audio_fmt.get('abr', 0)
-                        if abr and abr > 0:
-                            quality_label = f"{abr}kbps"
-                        else:
-                            # Try to extract quality from format note
-                            format_note = audio_fmt.get('format_note', '')
-                            if 'kbps' in format_note:
-                                try:
-                                    extracted_abr = int(''.join(filter(str.isdigit, format_note)))
-                                    quality_label = f"{extracted_abr}kbps"
-                                except ValueError:
-                                    quality_label = "Unknown"
-                            else:
-                                quality_label = "Unknown"
-                        
-                        downloadable_formats.append({
-                            'format_id': audio_fmt['format_id'],
-                            'ext': audio_fmt.get('ext', 'mp3'),
-                            'resolution': 'Audio Only',
-                            'resolution_precise': 'Audio Only',
-                            'filesize': audio_fmt.get('filesize', 0),
-                            'vcodec': 'none',
-                            'acodec': audio_fmt.get('acodec', 'Unknown'),
-                            'fps': 0,
-                            'height': 0,
-                            'width': 0,
-                            'download_type': 'audio_only',
-                            'description': f"Audio Only - {quality_label}",
-                            'tbr': 0,
-                            'vbr': 0,
-                            'abr': abr if abr else 0,
-                            'quality': quality_label
-                        })
-                    
-                    # Prepare playlist response data
-                    response_data = {
-                        'title': info.get('title', 'Unknown Playlist'),
-                        'duration': 0,  # Playlists don't have a single duration
-                        'thumbnail': info.get('thumbnail', ''),
-                        'uploader': info.get('uploader', 'Unknown'),
-                        'view_count': 0,  # Playlists don't have a single view count
-                        'formats': downloadable_formats,
-                        'is_playlist': True,
-                        'playlist_count': playlist_count,
-                        'playlist_entries': [
-                            {
-                                'id': entry.get('id', ''),
-                                'title': entry.get('title', 'Unknown Title'),
-                                'duration': entry.get('duration', 0),
-                                'thumbnail': entry.get('thumbnail', ''),
-                                'uploader': entry.get('uploader', 'Unknown'),
-                                'url': entry.get('url', ''),
-                                'webpage_url': entry.get('webpage_url', '')
-                            }
-                            for entry in entries[:50]  # Limit to first 50 entries for performance
-                        ]
-                    }
-                    
-                    print(f"Returning playlist data with {len(response_data['formats'])} formats")
-                    return jsonify(response_data)
-                else:
-                    print("Processing single video...")
-                    # Handle single video (existing code)
-                    # Get available formats
-                    video_formats, audio_formats = get_available_formats(info)
-                    print(f"Found {len(video_formats)} video formats, {len(audio_formats)} audio formats")
-                    
-                    downloadable_formats = get_downloadable_video_formats(video_formats, audio_formats)
-                    print(f"Created {len(downloadable_formats)} downloadable formats")
-                    
-                    # Add pure audio formats to downloadable formats
-                    for audio_fmt in audio_formats:
-                        # Create a proper quality label for audio
-                        abr = audio_fmt.get('abr', 0)
-                        if abr and abr > 0:
-                            quality_label = f"{abr}kbps"
-                        else:
-                            # Try to extract quality from format note
-                            format_note = audio_fmt.get('format_note', '')
-                            if 'kbps' in format_note:
-                                try:
-                                    extracted_abr = int(''.join(filter(str.isdigit, format_note)))
-                                    quality_label = f"{extracted_abr}kbps"
-                                except ValueError:
-                                    quality_label = "Unknown"
-                            else:
-                                quality_label = "Unknown"
-                        
-                        downloadable_formats.append({
-                            'format_id': audio_fmt['format_id'],
-                            'ext': audio_fmt['ext'],
-                            'resolution': 'Audio Only',
-                            'resolution_precise': 'Audio Only',
-                            'filesize': audio_fmt['filesize'],
-                            'vcodec': 'none',
-                            'acodec': audio_fmt['acodec'],
-                            'fps': 0,
-                            'height': 0,
-                            'width': 0,
-                            'download_type': 'audio_only',
-                            'description': f"Audio Only - {quality_label}",
-                            'tbr': 0,
-                            'vbr': 0,
-                            'abr': abr,
-                            'quality': quality_label
-                        })
-                    
-                    # Prepare single video response data
-                    response_data = {
-                        'title': info.get('title', 'Unknown Title'),
-                        'duration': info.get('duration', 0),
-                        'thumbnail': info.get('thumbnail', ''),
-                        'uploader': info.get('uploader', 'Unknown'),
-                        'view_count': info.get('view_count', 0),
-                        'formats': downloadable_formats,
-                        'is_playlist': False,
-                        'playlist_count': 0,
-                        'playlist_entries': []
-                    }
-                    
-                    print(f"Returning video data with {len(response_data['formats'])} formats")
-                    return jsonify(response_data)
+                return jsonify(response_data)
                 
             except Exception as e:
                 print(f"Error in video info API: {str(e)}")
                 return jsonify({'error': str(e)}), 500
 
+        @self.app.route('/api/video-info/batch', methods=['POST'])
+        def batch_video_info_api():
+            """Extract info for many URLs concurrently, streaming NDJSON results as they finish"""
+            try:
+                data = request.get_json(silent=True) or {}
+                urls = data.get('urls', [])
+                
+                if not isinstance(urls, list) or not urls:
+                    return jsonify({'error': 'A list of URLs is required'}), 400
+                if len(urls) > self.BATCH_MAX_URLS:
+                    return jsonify({'error': f'At most {self.BATCH_MAX_URLS} URLs per batch'}), 400
+                
+                urls = [str(url).strip() for url in urls]
+                return Response(
+                    stream_with_context(self.stream_batch_video_info(urls)),
+                    mimetype='application/x-ndjson'
+                )
+                
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        @self.app.route('/api/video-info/prefetch', methods=['POST'])
+        def prefetch_video_info_api():
+            """Warm the video info cache while the user is still typing"""
+            try:
+                data = request.get_json(silent=True) or {}
+                url = data.get('url', '').strip()
+                
+                if not url or not is_valid_youtube_url(url):
+                    return jsonify({'error': 'A valid YouTube URL is required'}), 400
+                # A playlist or channel would be fully extracted entry by entry, with no way to stop it
+                if not is_single_video_url(url):
+                    return jsonify({'error': 'Only single video URLs are prefetched'}), 400
+                
+                started = video_info_cache.prefetch(url)
+                return jsonify({'prefetching': started}), 202
+                
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
         @self.app.route('/api/download', methods=['POST'])
         def download_api():
             """Handle download requests"""
@@ -242,6 +243,15 @@ class TubeSyncDesktop:
                 if not url or not format_id:
                     return jsonify({'error': 'URL and format ID are required'}), 400
                 
+                # Optional time range - only that section is fetched
+                clip = None
+                if data.get('start_time') not in (None, '') or data.get('end_time') not in (None, ''):
+                    try:
+                        start, end = parse_clip_range(data.get('start_time'), data.get('end_time'))
+                    except ValueError as e:
+                        return jsonify({'error': str(e)}), 400
+                    clip = {'start': start, 'end': end, 'frame_accurate': bool(data.get('frame_accurate'))}
+                
                 # Ensure download path exists
                 if not os.path.exists(download_path):
                     try:
@@ -250,7 +260,7 @@ class TubeSyncDesktop:
                         return jsonify({'error': f'Failed to create download directory: {str(e)}'}), 500
                 
                 # Generate unique download ID
-                download_id = f"download_{int(time.time())}"
+                download_id = self.new_download_id('download')
                 self.download_progress[download_id] = {
                     'status': 'starting',
                     'progress': 0,
@@ -259,8 +269,8 @@ class TubeSyncDesktop:
                 
                 # Start download in background thread
                 thread = threading.Thread(
-                    target=self.download_with_progress,
-                    args=(url, format_id, download_type, download_id, download_path)
+                    target=self.job_target(download_id, self.download_with_progress),
+                    args=(url, format_id, download_type, download_id, download_path, clip)
                 )
                 thread.daemon = True
                 thread.start()
@@ -294,25 +304,29 @@ class TubeSyncDesktop:
                     except Exception as e:
                         return jsonify({'error': f'Failed to create download directory: {str(e)}'}), 500
                 
-                # Get playlist info first
-                info = get_video_info(url)
-                if not info or info.get('_type') != 'playlist':
-                    return jsonify({'error': 'URL is not a valid playlist'}), 400
-                
-                entries = info.get('entries', [])
-                if not entries:
-                    return jsonify({'error': 'Playlist is empty'}), 400
-                
-                # Limit the number of videos to download
-                entries = entries[:min(max_videos, len(entries))]
+                # Reuse the entries from the analyze step if they are still cached;
+                # otherwise list the playlist while the first videos download
+                info = video_info_cache.peek(url)
+                if info:
+                    if info.get('_type') != 'playlist':
+                        return jsonify({'error': 'URL is not a valid playlist'}), 400
+                    entries = list(itertools.islice(info.get('entries') or [], max_videos))
+                    if not entries:
+                        return jsonify({'error': 'Playlist is empty'}), 400
+                    total_videos = len(entries)
+                else:
+                    entries = read_ahead(iter_playlist_entries(url, max_videos), self.PLAYLIST_LISTING_BUFFER)
+                    total_videos = None
                 
                 # Generate unique playlist download ID
-                playlist_download_id = f"playlist_{int(time.time())}"
+                playlist_download_id = self.new_download_id('playlist')
                 self.download_progress[playlist_download_id] = {
                     'status': 'starting',
                     'progress': 0,
-                    'message': f'Starting playlist download ({len(entries)} videos)...',
-                    'total_videos': len(entries),
+                    'message': (f'Starting playlist download ({total_videos} videos)...' if total_videos
+                                else 'Listing playlist...'),
+                    'total_videos': total_videos or 0,
+                    'listing': total_videos is None,
                     'current_video': 0,
                     'completed_videos': 0,
                     'failed_videos': 0
@@ -320,7 +334,7 @@ class TubeSyncDesktop:
                 
                 # Start playlist download in background thread
                 thread = threading.Thread(
-                    target=self.download_playlist_with_progress,
+                    target=self.job_target(playlist_download_id, self.download_playlist_with_progress),
                     args=(url, format_id, download_type, playlist_download_id, download_path, entries)
                 )
                 thread.daemon = True
@@ -328,7 +342,66 @@ class TubeSyncDesktop:
                 
                 return jsonify({
                     'download_id': playlist_download_id,
-                    'message': f'Playlist download started ({len(entries)} videos)',
+                    'message': (f'Playlist download started ({total_videos} videos)' if total_videos
+                                else 'Playlist download started while listing videos'),
+                    'total_videos': total_videos
+                })
+                
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        @self.app.route('/api/download-bulk', methods=['POST'])
+        def download_bulk_api():
+            """Queue many videos as one grouped job in a single request"""
+            try:
+                data = request.get_json(silent=True) or {}
+                raw_entries = data.get('entries', [])
+                format_id = data.get('format_id', '')
+                download_type = data.get('download_type', 'video')
+                download_path = data.get('download_path', self.current_download_path)
+                
+                if not isinstance(raw_entries, list) or not raw_entries or not format_id:
+                    return jsonify({'error': 'Entries and format ID are required'}), 400
+                if len(raw_entries) > self.PLAYLIST_ENTRY_LIMIT:
+                    return jsonify({'error': f'At most {self.PLAYLIST_ENTRY_LIMIT} entries per job'}), 400
+                
+                entries = self.normalize_bulk_entries(raw_entries)
+                if not entries:
+                    return jsonify({'error': 'No valid entries to download'}), 400
+                
+                # Fall back to the best available stream for entries missing the chosen format
+                if data.get('fallback', True):
+                    format_id = format_with_fallback(format_id, download_type)
+                
+                # Ensure download path exists
+                if not os.path.exists(download_path):
+                    try:
+                        os.makedirs(download_path)
+                    except Exception as e:
+                        return jsonify({'error': f'Failed to create download directory: {str(e)}'}), 500
+                
+                bulk_download_id = self.new_download_id('bulk')
+                self.download_progress[bulk_download_id] = {
+                    'status': 'starting',
+                    'progress': 0,
+                    'message': f'Starting download of {len(entries)} selected videos...',
+                    'total_videos': len(entries),
+                    'current_video': 0,
+                    'completed_videos': 0,
+                    'failed_videos': 0
+                }
+                
+                # One worker thread for the whole group, same as playlist jobs
+                thread = threading.Thread(
+                    target=self.job_target(bulk_download_id, self.download_playlist_with_progress),
+                    args=(None, format_id, download_type, bulk_download_id, download_path, entries)
+                )
+                thread.daemon = True
+                thread.start()
+                
+                return jsonify({
+                    'download_id': bulk_download_id,
+                    'message': f'Download of {len(entries)} videos started',
                     'total_videos': len(entries)
                 })
                 
@@ -397,6 +470,41 @@ class TubeSyncDesktop:
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
+        @self.app.route('/api/library')
+        def query_library():
+            """Search downloaded media by text, uploader, resolution, duration and codecs"""
+            args = request.args
+            try:
+                result = self.media_library.query(
+                    q=args.get('q'),
+                    uploader=args.get('uploader'),
+                    video_id=args.get('video_id'),
+                    ext=args.get('ext'),
+                    vcodec=args.get('vcodec'),
+                    acodec=args.get('acodec'),
+                    min_height=args.get('min_height'),
+                    max_height=args.get('max_height'),
+                    min_duration=args.get('min_duration'),
+                    max_duration=args.get('max_duration'),
+                    sort=args.get('sort', 'added'),
+                    order=args.get('order', 'desc'),
+                    page=args.get('page', 1),
+                    per_page=args.get('per_page', 50)
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+            return jsonify(result)
+
+        @self.app.route('/api/library/<int:item_id>')
+        def get_library_item(item_id):
+            """Full library entry including stored video metadata"""
+            item = self.media_library.get(item_id)
+            if item is None:
+                return jsonify({'error': 'Library item not found'}), 404
+            return jsonify(item)
+
         @self.app.route('/api/progress/<download_id>')
         def get_progress(download_id):
             """Get download progress"""
@@ -404,6 +512,116 @@ class TubeSyncDesktop:
                 return jsonify(self.download_progress[download_id])
             return jsonify({'error': 'Download ID not found'}), 404
 
+        @self.app.route('/api/jobs/<download_id>/<action>', methods=['POST'])
+        def job_control_api(download_id, action):
+            """Cancel, pause or resume a running download job"""
+            if action not in ('cancel', 'pause', 'resume'):
+                return jsonify({'error': f'Unknown action: {action}'}), 400
+            
+            control = self.job_controls.get(download_id)
+            if control is None:
+                if download_id in self.download_progress:
+                    return jsonify({'error': 'Download is no longer running',
+                                    'status': self.download_progress[download_id].get('status')}), 409
+                return jsonify({'error': 'Download ID not found'}), 404
+            
+            # The worker picks the signal up at its next progress callback
+            getattr(control, action)()
+            progress = self.download_progress.get(download_id, {})
+            if action == 'cancel':
+                progress['message'] = 'Cancelling...'
+            elif action == 'pause':
+                progress['message'] = 'Pausing...'
+            print(f"Job {download_id}: {action} requested")
+            return jsonify({'download_id': download_id, 'action': action, 'status': progress.get('status')})
+
+        @self.app.route('/api/jobs/<download_id>/trace')
+        def job_trace_api(download_id):
+            """Timeline of a job as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+            trace = self.job_traces.get(download_id)
+            if trace is None:
+                return jsonify({'error': 'Download ID not found'}), 404
+            return jsonify(trace.to_chrome_trace())
+
+        @self.app.route('/api/subscriptions', methods=['GET'])
+        def list_subscriptions():
+            """List saved sync subscriptions"""
+            return jsonify(self.sync_manager.list())
+
+        @self.app.route('/api/subscriptions', methods=['POST'])
+        def add_subscription():
+            """Subscribe a playlist or channel to scheduled incremental sync"""
+            try:
+                data = request.get_json() or {}
+                url = data.get('url', '').strip()
+                download_type = data.get('download_type', 'video')
+                download_path = data.get('download_path', self.current_download_path)
+                
+                if not url:
+                    return jsonify({'error': 'URL is required'}), 400
+                if not is_valid_youtube_url(url):
+                    return jsonify({'error': 'Invalid YouTube URL'}), 400
+                
+                try:
+                    interval_hours = float(data.get('interval_hours') or SyncManager.DEFAULT_INTERVAL_HOURS)
+                    max_videos = int(data['max_videos']) if data.get('max_videos') else None
+                except (TypeError, ValueError):
+                    return jsonify({'error': 'interval_hours and max_videos must be numbers'}), 400
+                if interval_hours <= 0:
+                    return jsonify({'error': 'interval_hours must be positive'}), 400
+                
+                # Format policy: a specific format ID, or the best available
+                default_format = 'bestaudio/best' if download_type in ('audio', 'raw') else 'bestvideo+bestaudio/best'
+                format_id = format_with_fallback(data.get('format_id') or default_format, download_type)
+                
+                listing_url = sync_listing_url(url)
+                newest_first = data.get('newest_first')
+                if newest_first is None:
+                    newest_first = is_newest_first(listing_url)
+                
+                subscription = self.sync_manager.add(listing_url, download_path, format_id, download_type,
+                                                     interval_hours, bool(newest_first), max_videos)
+                return jsonify(subscription), 201
+                
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        @self.app.route('/api/subscriptions/<subscription_id>', methods=['DELETE'])
+        def remove_subscription(subscription_id):
+            """Delete a sync subscription (downloaded files are kept)"""
+            if not self.sync_manager.remove(subscription_id):
+                return jsonify({'error': 'Subscription not found'}), 404
+            return jsonify({'message': 'Subscription removed'})
+
+        @self.app.route('/api/subscriptions/<subscription_id>/run', methods=['POST'])
+        def run_subscription(subscription_id):
+            """Sync a subscription now instead of waiting for its schedule"""
+            if not self.sync_manager.run_now(subscription_id):
+                return jsonify({'error': 'Subscription not found'}), 404
+            return jsonify({'message': 'Sync queued'}), 202
+
+        @self.app.route('/api/thumb/<video_id>')
+        def thumbnail_api(video_id):
+            """Serve a video thumbnail from the local cache"""
+            try:
+                variant = request.args.get('variant', 'mqdefault')
+                thumbnail_path = self.thumbnail_cache.get(video_id, variant, hold=True)
+                if not thumbnail_path:
+                    return jsonify({'error': 'Thumbnail not available'}), 404
+                
+                # Let the webview cache it too; revalidation is handled server-side.
+                # The file is kept out of eviction until the response is fully sent.
+                try:
+                    response = send_file(thumbnail_path, mimetype='image/jpeg', max_age=86400)
+                except Exception:
+                    self.thumbnail_cache.release(video_id, variant)
+                    raise
+                response.call_on_close(lambda: self.thumbnail_cache.release(video_id, variant))
+                return response
+                
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
         @self.app.route('/api/formats/<format_id>')
         def get_format_details(format_id):
             """Get detailed format information"""
@@ -425,13 +643,244 @@ class TubeSyncDesktop:
             except FileNotFoundError:
                 return jsonify({'error': 'File not found'}), 404
 
-    def download_with_progress(self, url, format_id, download_type, download_id, download_path):
+    def batch_video_info_item(self, index, url):
+        """Build one NDJSON result for the batch endpoint"""
+        if not url:
+            return {'index': index, 'url': url, 'error': 'URL is required'}
+        try:
+            info = video_info_cache.get(url)
+            if not info:
+                return {'index': index, 'url': url, 'error': 'Could not fetch video information'}
+            response_data, error = self.build_video_info_payload(info)
+            if error:
+                return {'index': index, 'url': url, 'error': error}
+            return {'index': index, 'url': url, 'info': response_data}
+        except Exception as e:
+            return {'index': index, 'url': url, 'error': str(e)}
+
+    def stream_batch_video_info(self, urls):
+        """Yield one JSON line per URL in completion order"""
+        executor = ThreadPoolExecutor(max_workers=self.BATCH_INFO_WORKERS,
+                                      thread_name_prefix='tubesync-batch')
+        futures = [executor.submit(self.batch_video_info_item, index, url)
+                   for index, url in enumerate(urls)]
+        try:
+            for future in as_completed(futures):
+                yield json.dumps(future.result(), separators=(',', ':')) + '\n'
+        finally:
+            # Client went away or we are done - drop anything not yet started
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def build_video_info_payload(self, info):
+        """Build the /api/video-info response for an info dict.
+        
+        Returns (response_data, None) on success or (None, error_message).
+        """
+        # Check if this is a playlist
+        is_playlist = info.get('_type') == 'playlist'
+        playlist_count = info.get('playlist_count', 0)
+        
+        if is_playlist:
+            print(f"Processing playlist with {playlist_count} videos")
+            # Handle playlist
+            entries = info.get('entries', [])
+            if not entries:
+                print("Error: Playlist is empty")
+                return None, 'Playlist is empty or could not be processed'
+            
+            # Get first video info for format reference
+            first_video = entries[0]
+            if not first_video:
+                print("Error: Could not get first video from playlist")
+                return None, 'Could not get first video from playlist'
+            
+            # Get available formats for the first video
+            print("Getting formats for first video...")
+            downloadable_formats = self.build_format_list(first_video)
+            
+            # Prepare playlist response data
+            response_data = {
+                'id': info.get('id', ''),
+                'title': info.get('title', 'Unknown Playlist'),
+                'duration': 0,  # Playlists don't have a single duration
+                'thumbnail': info.get('thumbnail', ''),
+                'uploader': info.get('uploader', 'Unknown'),
+                'view_count': 0,  # Playlists don't have a single view count
+                'formats': downloadable_formats,
+                'is_playlist': True,
+                'playlist_count': playlist_count,
+                'playlist_entries': [
+                    compact_playlist_entry(entry)
+                    for entry in entries[:self.PLAYLIST_ENTRY_LIMIT] if entry
+                ]
+            }
+            
+            print(f"Returning playlist data with {len(response_data['formats'])} formats")
+            return response_data, None
+        else:
+            print("Processing single video...")
+            downloadable_formats = self.build_format_list(info)
+            
+            # Prepare single video response data
+            response_data = {
+                'id': info.get('id', ''),
+                'title': info.get('title', 'Unknown Title'),
+                'duration': info.get('duration', 0),
+                'thumbnail': info.get('thumbnail', ''),
+                'uploader': info.get('uploader', 'Unknown'),
+                'view_count': info.get('view_count', 0),
+                'formats': downloadable_formats,
+                'is_playlist': False,
+                'playlist_count': 0,
+                'playlist_entries': []
+            }
+            
+            print(f"Returning video data with {len(response_data['formats'])} formats")
+            return response_data, None
+
+    def build_format_list(self, info):
+        """Build the compact, de-duplicated format list for a video info dict"""
+        video_formats, audio_formats = get_available_formats(info)
+        print(f"Found {len(video_formats)} video formats, {len(audio_formats)} audio formats")
+        
+        # get_downloadable_video_formats already includes the audio-only formats
+        downloadable_formats = compact_formats(get_downloadable_video_formats(video_formats, audio_formats))
+        print(f"Created {len(downloadable_formats)} downloadable formats")
+        return downloadable_formats
+
+    def new_download_id(self, prefix):
+        """Unique progress ID - several jobs can start within the same second"""
+        download_id = f"{prefix}_{int(time.time())}_{next(self._download_counter)}"
+        self.job_controls[download_id] = JobControl()
+        self.prune_job_traces()
+        self.job_traces[download_id] = JobTrace(download_id)
+        return download_id
+
+    def finish_job(self, download_id):
+        """Release a job's control and start its trace's retention period"""
+        self.job_controls.pop(download_id, None)
+        trace = self.job_traces.get(download_id)
+        if trace is not None:
+            trace.finish()
+
+    def prune_job_traces(self):
+        """Drop traces of jobs that finished over JOB_TRACE_TTL ago, then the oldest beyond JOB_TRACE_LIMIT"""
+        expired = time.time() - self.JOB_TRACE_TTL
+        finished = [(trace.finished, download_id) for download_id, trace in list(self.job_traces.items())
+                    if trace.finished is not None]
+        finished.sort()
+        excess = len(finished) - self.JOB_TRACE_LIMIT
+        for index, (finished_at, download_id) in enumerate(finished):
+            if finished_at < expired or index < excess:
+                self.job_traces.pop(download_id, None)
+
+    def run_sync_job(self, subscription, entries):
+        """Download a sync run's new entries as one job; returns (download_id, outcome per entry)"""
+        download_path = subscription['download_path']
+        if not os.path.exists(download_path):
+            os.makedirs(download_path)
+        
+        sync_download_id = self.new_download_id('sync')
+        self.download_progress[sync_download_id] = {
+            'status': 'starting',
+            'progress': 0,
+            'message': f'Syncing {len(entries)} new videos...',
+            'total_videos': len(entries),
+            'current_video': 0,
+            'completed_videos': 0,
+            'failed_videos': 0,
+            'subscription_id': subscription['id']
+        }
+        
+        # Runs in the sync thread so subscriptions are synced one at a time
+        outcomes = self.download_playlist_with_progress(subscription['url'], subscription['format_id'],
+                                                        subscription['download_type'], sync_download_id,
+                                                        download_path, entries)
+        results = [self.VIDEO_OUTCOMES[outcomes[i]] if i < len(outcomes) else 'pending' for i in range(len(entries))]
+        return sync_download_id, results
+
+    def job_target(self, download_id, target):
+        """Worker function for a job thread, profiled when the current request asks for it"""
+        if self.profiler.wants(request.headers):
+            return self.profiler.wrap_job(f'job_{download_id}', target)
+        return target
+
+    def normalize_bulk_entries(self, raw_entries):
+        """Turn bulk request entries (IDs, URLs or entry dicts) into playlist-style entries"""
+        entries = []
+        seen = set()
+        for raw in raw_entries:
+            if isinstance(raw, dict):
+                video_id = str(raw.get('id') or '')
+                url = raw.get('webpage_url') or raw.get('url') or ''
+                title = raw.get('title') or 'Unknown'
+            else:
+                video_id, url, title = '', str(raw).strip(), 'Unknown'
+            
+            if not url and video_id:
+                url = f"https://www.youtube.com/watch?v={video_id}"
+            elif url and not url.startswith(('http://', 'https://')):
+                # Bare video ID
+                video_id, url = url, f"https://www.youtube.com/watch?v={url}"
+            
+            if not url or url in seen:
+                continue
+            seen.add(url)
+            entries.append({'id': video_id, 'title': title, 'webpage_url': url})
+        return entries
+
+    def prefetch_playlist_entries(self, entries):
+        """Start background extraction for playlist entries that are not fully resolved"""
+        for entry in entries:
+            if not entry or entry.get('formats'):
+                continue
+            entry_url = entry.get('webpage_url') or entry.get('url')
+            if entry_url:
+                video_info_cache.prefetch(entry_url)
+
+    def compress_response(self, response):
+        """Compress JSON responses with brotli or gzip when the client accepts it"""
+        try:
+            if (response.mimetype != 'application/json' or response.direct_passthrough or response.is_streamed or
+                    'Content-Encoding' in response.headers or response.status_code < 200):
+                return response
+            
+            accept_encoding = request.headers.get('Accept-Encoding', '').lower()
+            data = response.get_data()
+            response.vary.add('Accept-Encoding')
+            
+            # Tiny payloads are not worth the CPU time
+            if len(data) < self.COMPRESS_MIN_SIZE:
+                return response
+            
+            if brotli is not None and 'br' in accept_encoding:
+                response.set_data(brotli.compress(data, quality=5))
+                response.headers['Content-Encoding'] = 'br'
+            elif 'gzip' in accept_encoding:
+                response.set_data(gzip.compress(data, compresslevel=6))
+                response.headers['Content-Encoding'] = 'gzip'
+        except Exception as e:
+            print(f"Response compression error: {e}")
+        return response
+
+    def download_with_progress(self, url, format_id, download_type, download_id, download_path, clip=None):
         """Download with progress tracking"""
         try:
             print(f"Starting download with ID: {download_id}")
             self.download_progress[download_id]['status'] = 'downloading'
+            control = self.job_controls.setdefault(download_id, JobControl())
+            trace = self.job_traces.setdefault(download_id, JobTrace(download_id))
+            trace.add('job', 'queue_wait', trace.created, time.time(), 'idle')
+            transferred = {}  # filename -> bytes, for the clip savings report
             
             def progress_callback(d):
+                trace.on_progress('download', d)
+                # Raises inside yt-dlp when the job is paused or cancelled
+                control.check(d)
+                if d['status'] == 'finished':
+                    transferred[d.get('filename')] = d.get('total_bytes') or d.get('downloaded_bytes') or 0
                 if d['status'] == 'downloading':
                     # Calculate progress percentage
                     if 'total_bytes' in d and d['total_bytes']:
@@ -472,17 +921,35 @@ class TubeSyncDesktop:
             print(f"Starting download with type: {actual_download_type}")
             
             # Perform download based on actual type
+            postprocessor_callback = lambda d: trace.on_postprocess('download', d)
             if actual_download_type == 'video' or actual_download_type == 'video_only':
-                result = download_video(url, format_id, download_path, progress_callback)
+                download = lambda: download_video(url, format_id, download_path, progress_callback, clip, postprocessor_callback, info)
             elif actual_download_type == 'audio':
-                result = download_audio(url, format_id, download_path, progress_callback)
+                download = lambda: download_audio(url, format_id, download_path, progress_callback, clip, postprocessor_callback, info)
             else:  # raw audio
-                result = download_audio_raw(url, format_id, download_path, progress_callback)
+                download = lambda: download_audio_raw(url, format_id, download_path, progress_callback, clip, postprocessor_callback, info)
+            
+            with trace.span('download', 'extraction', 'extraction', source='info cache'):
+                info = video_info_cache.get(url)
+            result = self.run_admitted(control, trace, 'download', download_id, info, format_id, actual_download_type,
+                                       download_path, download, clip)
             
-            if result and result.get('success'):
+            if result is None:
+                control.remove_temp_files()
+                self.download_progress[download_id]['status'] = 'cancelled'
+                self.download_progress[download_id]['message'] = 'Download cancelled'
+                print("Download cancelled")
+            elif result and result.get('success'):
                 self.download_progress[download_id]['status'] = 'completed'
                 self.download_progress[download_id]['progress'] = 100
                 self.download_progress[download_id]['message'] = 'Download completed successfully!'
+                self.add_to_library(result, info, format_id, actual_download_type)
+                if result.get('delivered'):
+                    # Served from the local media store, nothing was transferred
+                    self.download_progress[download_id]['delivered'] = result['delivered']
+                    self.download_progress[download_id]['message'] = f"Delivered from the local media store ({result['delivered']})"
+                elif clip:
+                    self.report_clip_savings(download_id, clip, info, format_id, sum(transferred.values()))
                 print("Download completed successfully!")
             else:
                 self.download_progress[download_id]['status'] = 'error'
@@ -493,30 +960,170 @@ class TubeSyncDesktop:
             self.download_progress[download_id]['status'] = 'error'
             self.download_progress[download_id]['message'] = f'Error: {str(e)}'
             print(f"Download error: {str(e)}")
+        finally:
+            self.finish_job(download_id)
+
+    def run_controlled(self, control, trace, track, progress_id, download):
+        """Run a download callable, sitting out pauses; returns None if the job was cancelled"""
+        while True:
+            trace.begin_attempt(track)
+            result = download()
+            succeeded = bool(result and result.get('success'))
+            # Close spans the hooks left open when the attempt stopped early
+            trace.end_all(track, interrupted=not succeeded)
+            if succeeded:
+                return result
+            if control.cancelled:
+                return None
+            if not control.paused:
+                return result
+            
+            # The .part file is kept, so the next attempt continues from its byte offset
+            self.download_progress[progress_id]['status'] = 'paused'
+            self.download_progress[progress_id]['message'] = 'Paused'
+            print(f"Download {progress_id} paused")
+            with trace.span(track, 'paused', 'idle'):
+                resumed = control.wait_while_paused()
+            if not resumed:
+                return None
+            self.download_progress[progress_id]['status'] = 'downloading'
+            self.download_progress[progress_id]['message'] = 'Resuming...'
+            print(f"Download {progress_id} resumed")
+
+    def add_to_library(self, result, info, format_id, download_type):
+        """Index a finished file; a library failure never fails the download"""
+        filepath = result.get('filepath')
+        if not filepath:
+            return
+        try:
+            self.media_library.record(filepath, info, format_id, download_type)
+        except Exception as e:
+            print(f"Error adding {filepath} to library: {e}")
+
+    def report_clip_savings(self, download_id, clip, info, format_id, clip_bytes):
+        """Record how many bytes the clip avoided compared with a full download"""
+        full_bytes = estimate_media_size(info, format_id)
+        saved_bytes = max(full_bytes - clip_bytes, 0) if full_bytes else None
+        self.download_progress[download_id]['clip'] = {
+            'start_time': clip['start'],
+            'end_time': clip['end'],
+            'frame_accurate': clip['frame_accurate'],
+            'bytes_downloaded': clip_bytes,
+            'full_size_estimate': full_bytes or None,
+            'bytes_saved': saved_bytes
+        }
+        if saved_bytes:
+            self.download_progress[download_id]['message'] = (f'Clip downloaded successfully! '
+                                                              f'Saved ~{saved_bytes / (1024 * 1024):.1f}MB versus the full video.')
+        print(f"Clip {download_id}: {clip_bytes} bytes downloaded, full download ~{full_bytes} bytes")
+
+    def run_admitted(self, control, trace, track, progress_id, info, format_id, download_type, download_path, download, clip=None):
+        """Reserve the estimated disk space, holding the job until it fits, then run the download"""
+        estimate = estimate_download_size(info, format_id, extract_audio=download_type in ('audio', 'raw'), clip=clip)
+        progress = self.download_progress[progress_id]
+        message = progress.get('message')
+        
+        def on_hold(needed, available):
+            if progress['status'] != 'waiting_for_space':
+                print(f"Download {progress_id} held: needs {needed} bytes, {available} available")
+                trace.begin(track, 'admission', 'waiting_for_space', 'idle')
+            progress['status'] = 'waiting_for_space'
+            progress['message'] = (f'Waiting for disk space ({needed / (1024 * 1024):.0f}MB needed, '
+                                   f'{max(available, 0) / (1024 * 1024):.0f}MB free)')
+        
+        with disk_reservations.reserve(download_path, estimate, control, on_hold) as admitted:
+            trace.end(track, 'admission')
+            if not admitted:
+                return None
+            if progress['status'] == 'waiting_for_space':
+                progress['status'] = 'downloading'
+                progress['message'] = message
+            return self.run_controlled(control, trace, track, progress_id, download)
 
     def download_playlist_with_progress(self, playlist_url, format_id, download_type, playlist_download_id, download_path, entries):
-        """Download playlist with progress tracking"""
+        """Download playlist with progress tracking.
+        
+        entries is a list or an iterator that is still listing the playlist;
+        it is consumed only a few entries ahead of the current download.
+        Per-video progress is only tracked while a video is being worked on;
+        returns a bytearray with the outcome (index into VIDEO_OUTCOMES) of each listed entry.
+        """
+        outcomes = bytearray()
         try:
             self.download_progress[playlist_download_id]['status'] = 'downloading'
-            total_videos = len(entries)
+            control = self.job_controls.setdefault(playlist_download_id, JobControl())
+            trace = self.job_traces.setdefault(playlist_download_id, JobTrace(playlist_download_id))
+            trace.add('job', 'queue_wait', trace.created, time.time(), 'idle')
             completed_videos = 0
             failed_videos = 0
+            retry_count = 0
+            retries = self.download_progress[playlist_download_id].setdefault('retries', [])
+            item_delay = self.PLAYLIST_ITEM_DELAY
+            
+            # (index, entry, attempt, not_before); entries are pulled from the
+            # listing only a few ahead of the download, failed ones wait in retry_queue
+            stream = iter(entries)
+            listed = 0
+            listing_error = None
+            queue = deque()
+            retry_queue = deque()
             
-            for i, entry in enumerate(entries):
+            while True:
+                while stream is not None and len(queue) <= self.PLAYLIST_PREFETCH_AHEAD:
+                    try:
+                        queue.append((listed, next(stream), 0, 0))
+                        outcomes.append(self.VIDEO_PENDING)
+                        listed += 1
+                    except StopIteration:
+                        stream = None
+                    except Exception as e:
+                        print(f"Error listing playlist: {e}")
+                        listing_error = e
+                        stream = None
+                self.download_progress[playlist_download_id]['total_videos'] = listed
+                self.download_progress[playlist_download_id]['listing'] = stream is not None
+                if not queue and not retry_queue:
+                    break
+                
+                # Honour a pause/cancel requested between videos
+                if control.paused:
+                    self.download_progress[playlist_download_id]['status'] = 'paused'
+                    self.download_progress[playlist_download_id]['message'] = 'Paused'
+                    with trace.span('job', 'paused', 'idle'):
+                        control.wait_while_paused()
+                    self.download_progress[playlist_download_id]['status'] = 'downloading'
+                if control.cancelled:
+                    break
+                
+                i, entry, attempt, not_before = queue.popleft() if queue else retry_queue.popleft()
+                track = f'video {i + 1}'
+                wait = not_before - time.time()
+                if wait > 0:
+                    self.download_progress[playlist_download_id]['message'] = f'Waiting {wait:.0f}s before retrying video {i + 1}...'
+                    with trace.span(track, 'retry_wait', 'idle', attempt=attempt):
+                        slept = control.sleep(wait)
+                    if not slept:
+                        break
+                
+                video_download_id = f"{playlist_download_id}_video_{i}"
                 try:
+                    # Resolve the next few entries while this one downloads
+                    upcoming = itertools.islice(itertools.chain(queue, retry_queue), self.PLAYLIST_PREFETCH_AHEAD)
+                    self.prefetch_playlist_entries([item[1] for item in upcoming])
+                    
                     # Update progress for current video
                     self.download_progress[playlist_download_id]['current_video'] = i + 1
-                    self.download_progress[playlist_download_id]['message'] = f'Downloading video {i + 1}/{total_videos}: {entry.get("title", "Unknown")[:50]}...'
+                    self.download_progress[playlist_download_id]['message'] = f'Downloading video {i + 1}/{listed}{"+" if stream is not None else ""}: {entry.get("title", "Unknown")[:50]}...'
                     
                     # Get the video URL
                     video_url = entry.get('webpage_url') or entry.get('url')
                     if not video_url:
                         print(f"Warning: No URL found for video {i + 1}")
                         failed_videos += 1
+                        outcomes[i] = self.VIDEO_OUTCOMES.index('permanent')
                         continue
                     
-                    # Create a temporary download ID for this video
-                    video_download_id = f"{playlist_download_id}_video_{i}"
+                    # Progress for the video being worked on; dropped once this attempt is over
                     self.download_progress[video_download_id] = {
                         'status': 'downloading',
                         'progress': 0,
@@ -524,6 +1131,8 @@ class TubeSyncDesktop:
                     }
                     
                     def video_progress_callback(d):
+                        trace.on_progress(track, d)
+                        control.check(d)
                         if d['status'] == 'downloading':
                             # Calculate progress percentage for this video
                             if 'total_bytes' in d and d['total_bytes']:
@@ -536,7 +1145,8 @@ class TubeSyncDesktop:
                             self.download_progress[video_download_id]['progress'] = min(progress, 100)
                             
                             # Calculate overall playlist progress
-                            overall_progress = ((i * 100) + progress) / total_videos
+                            done_videos = completed_videos + failed_videos
+                            overall_progress = ((done_videos * 100) + progress) / listed
                             self.download_progress[playlist_download_id]['progress'] = min(overall_progress, 100)
                     
                     # Determine actual download type based on format_id and download_type
@@ -553,39 +1163,99 @@ class TubeSyncDesktop:
                     print(f"Downloading video {i + 1} with type: {actual_download_type}")
                     
                     # Perform download based on actual type
+                    postprocessor_callback = lambda d: trace.on_postprocess(track, d)
                     if actual_download_type == 'video':
-                        result = download_video(video_url, format_id, download_path, video_progress_callback)
+                        download = lambda: download_video(video_url, format_id, download_path, video_progress_callback,
+                                                          postprocessor_callback=postprocessor_callback, info=info)
                     elif actual_download_type == 'audio':
-                        result = download_audio(video_url, format_id, download_path, video_progress_callback)
+                        download = lambda: download_audio(video_url, format_id, download_path, video_progress_callback,
+                                                          postprocessor_callback=postprocessor_callback, info=info)
                     else:  # raw audio
-                        result = download_audio_raw(video_url, format_id, download_path, video_progress_callback)
+                        download = lambda: download_audio_raw(video_url, format_id, download_path, video_progress_callback,
+                                                              postprocessor_callback=postprocessor_callback, info=info)
                     
-                    if result and result.get('success'):
+                    # Flat entries use the prefetched info when there is one; otherwise the
+                    # download extracts on its own and admission goes without an estimate
+                    if entry.get('formats'):
+                        info = entry
+                    else:
+                        with trace.span(track, 'extraction', 'extraction', source='info cache'):
+                            info = video_info_cache.peek(video_url, wait=True)
+                    result = self.run_admitted(control, trace, track, playlist_download_id, info, format_id,
+                                               actual_download_type, download_path, download)
+                    
+                    if result is None:
+                        break
+                    elif result and result.get('success'):
+                        control.forget_files()
                         completed_videos += 1
-                        self.download_progress[video_download_id]['status'] = 'completed'
-                        self.download_progress[video_download_id]['progress'] = 100
-                        self.download_progress[video_download_id]['message'] = 'Download completed successfully!'
-                        print(f"Video {i + 1} downloaded successfully")
+                        outcomes[i] = self.VIDEO_COMPLETED
+                        self.add_to_library(result, info, format_id, actual_download_type)
+                        delivered = f" (from the local media store, {result['delivered']})" if result.get('delivered') else ''
+                        print(f"Video {i + 1} downloaded successfully{delivered}")
+                        # Ease back towards the normal pace after a rate limit
+                        item_delay = max(self.PLAYLIST_ITEM_DELAY, item_delay * 0.9)
                     else:
-                        failed_videos += 1
-                        self.download_progress[video_download_id]['status'] = 'error'
-                        self.download_progress[video_download_id]['message'] = result.get('error', 'Download failed')
-                        print(f"Video {i + 1} failed: {result.get('error', 'Unknown error')}")
+                        error = result.get('error', 'Download failed')
+                        cause = classify_download_error(error)
+                        if cause in RETRYABLE_ERRORS and attempt < self.PLAYLIST_MAX_RETRIES:
+                            delay = backoff_delay(attempt, self.RETRY_BASE_DELAY, self.RETRY_MAX_DELAY)
+                            if cause == 'throttled':
+                                # Rate limited: slow the whole job, not just this entry
+                                item_delay = min(item_delay * 2, self.THROTTLE_MAX_DELAY)
+                                delay = max(delay, item_delay)
+                            retry_queue.append((i, entry, attempt + 1, time.time() + delay))
+                            retry_count += 1
+                            retries.append({
+                                'video': i + 1,
+                                'title': entry.get('title', 'Unknown')[:50],
+                                'attempt': attempt + 1,
+                                'cause': cause,
+                                'error': error[:200],
+                                'retry_in': round(delay, 1)
+                            })
+                            del retries[:-self.PLAYLIST_RETRY_LOG]
+                            print(f"Video {i + 1} failed ({cause}), retry {attempt + 1} queued in {delay:.1f}s: {error}")
+                        else:
+                            failed_videos += 1
+                            outcomes[i] = self.VIDEO_OUTCOMES.index(cause)
+                            print(f"Video {i + 1} failed ({cause}): {error}")
                     
                     # Update overall playlist progress
                     self.download_progress[playlist_download_id]['completed_videos'] = completed_videos
                     self.download_progress[playlist_download_id]['failed_videos'] = failed_videos
+                    self.download_progress[playlist_download_id]['retry_count'] = retry_count
+                    self.download_progress[playlist_download_id]['item_delay'] = round(item_delay, 1)
                     
-                    # Small delay to prevent overwhelming the system
-                    time.sleep(1)
+                    # Pause between videos; longer while the site is rate limiting
+                    if queue or retry_queue or stream is not None:
+                        with trace.span('job', 'item_delay', 'idle'):
+                            control.sleep(item_delay)
                     
                 except Exception as e:
                     failed_videos += 1
+                    outcomes[i] = self.VIDEO_OUTCOMES.index(classify_download_error(str(e)))
                     print(f"Error downloading video {i + 1}: {str(e)}")
                     self.download_progress[playlist_download_id]['failed_videos'] = failed_videos
+                finally:
+                    self.download_progress.pop(video_download_id, None)
             
             # Final playlist status
-            if failed_videos == 0:
+            if listed == 0 and listing_error is None:
+                self.download_progress[playlist_download_id]['status'] = 'error'
+                self.download_progress[playlist_download_id]['message'] = 'Playlist is empty'
+            elif listing_error is not None and completed_videos == 0 and not control.cancelled:
+                self.download_progress[playlist_download_id]['status'] = 'error'
+                self.download_progress[playlist_download_id]['message'] = f'Could not list playlist: {listing_error}'
+            elif listing_error is not None and not control.cancelled:
+                self.download_progress[playlist_download_id]['status'] = 'completed_with_errors'
+                self.download_progress[playlist_download_id]['progress'] = 100
+                self.download_progress[playlist_download_id]['message'] = f'Playlist listing stopped early ({listing_error}). {completed_videos} videos downloaded successfully.'
+            elif control.cancelled:
+                control.remove_temp_files()
+                self.download_progress[playlist_download_id]['status'] = 'cancelled'
+                self.download_progress[playlist_download_id]['message'] = f'Playlist download cancelled. {completed_videos} videos downloaded before cancelling.'
+            elif failed_videos == 0:
                 self.download_progress[playlist_download_id]['status'] = 'completed'
                 self.download_progress[playlist_download_id]['progress'] = 100
                 self.download_progress[playlist_download_id]['message'] = f'Playlist download completed! {completed_videos} videos downloaded successfully.'
@@ -597,6 +1267,13 @@ class TubeSyncDesktop:
         except Exception as e:
             self.download_progress[playlist_download_id]['status'] = 'error'
             self.download_progress[playlist_download_id]['message'] = f'Playlist download error: {str(e)}'
+        finally:
+            # Stop a listing that is still running (cancelled or failed job)
+            close = getattr(entries, 'close', None)
+            if close:
+                close()
+            self.finish_job(playlist_download_id)
+        return outcomes
 
     def start_flask(self):
         """Start Flask server in background thread"""
@@ -640,6 +1317,7 @@ class TubeSyncDesktop:
             # Start Flask server in background
             self.flask_thread = threading.Thread(target=self.start_flask, daemon=True)
             self.flask_thread.start()
+            self.sync_manager.start()
             
             # Wait a moment for Flask to start and get the port
             time.sleep(3)
@@ -675,6 +1353,13 @@ class TubeSyncDesktop:
             # Start webview
             webview.start(debug=False)
             
+            # Window closed - stop scheduled syncs and release pooled YoutubeDL sessions
+            self.sync_manager.stop()
+            if ydl_pool is not None:
+                ydl_pool.close()
+            if extraction_pool is not None:
+                extraction_pool.close()
+            
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start TubeSync: {str(e)}")
             print(f"Error: {e}")
@@ -699,4 +1384,6 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
+    # Extraction worker processes re-enter here when the app is frozen
+    multiprocessing.freeze_support()
     main() 
\ No newline at end of file
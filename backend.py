@@ -6,8 +6,454 @@ TubeSync Backend - YouTube Video Downloader Functions
 import yt_dlp
 import os
 import re
+import json
+import math
+import multiprocessing
+import queue
+import random
+import shutil
+import time
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from urllib.parse import urlparse
 
+from media_store import media_key, media_store_from_env
+
+class _PooledYoutubeDL:
+    """A YoutubeDL instance plus the progress callbacks of its current borrower"""
+    def __init__(self, ydl_opts):
+        self.callback = None
+        self.postprocessor_callback = None
+        opts = dict(ydl_opts)
+        # Stable hooks dispatch to whoever holds the instance
+        opts['progress_hooks'] = [self._dispatch_progress]
+        opts['postprocessor_hooks'] = [self._dispatch_postprocessor]
+        self.ydl = yt_dlp.YoutubeDL(opts)
+
+    def _dispatch_progress(self, d):
+        callback = self.callback
+        if callback:
+            callback(d)
+
+    def _dispatch_postprocessor(self, d):
+        callback = self.postprocessor_callback
+        if callback:
+            callback(d)
+
+class YoutubeDLPool:
+    """Pool of reusable YoutubeDL instances grouped by option set.
+    
+    Each instance is used by one thread at a time. Keeping instances alive
+    between calls preserves extractor state (player JS, signature functions)
+    and the HTTP session, so repeat calls skip setup and TLS handshakes.
+    PER_CALL_OPTIONS are not part of the pool key: they are set on the
+    borrowed instance for one call, so every clip range shares instances.
+    """
+    # Options yt-dlp reads from params at download time
+    PER_CALL_OPTIONS = ('download_ranges', 'force_keyframes_at_cuts')
+
+    def __init__(self, max_idle_per_key=4, max_keys=16):
+        self.max_idle_per_key = max_idle_per_key
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._idle = OrderedDict()  # option key -> idle _PooledYoutubeDL list
+        self.stats = {'created': 0, 'reused': 0, 'discarded': 0}
+
+    @staticmethod
+    def _key(ydl_opts):
+        return json.dumps(ydl_opts, sort_keys=True, default=repr)
+
+    @contextmanager
+    def acquire(self, ydl_opts, callback=None, postprocessor_callback=None):
+        """Borrow a YoutubeDL for ydl_opts; download and post-processing progress go to the callbacks"""
+        per_call = {name: ydl_opts[name] for name in self.PER_CALL_OPTIONS if name in ydl_opts}
+        ydl_opts = {name: value for name, value in ydl_opts.items() if name not in per_call}
+        key = self._key(ydl_opts)
+        pooled = None
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                pooled = idle.pop()
+                self._idle.move_to_end(key)
+                self.stats['reused'] += 1
+        if pooled is None:
+            pooled = _PooledYoutubeDL(ydl_opts)
+            with self._lock:
+                self.stats['created'] += 1
+        
+        pooled.callback = callback
+        pooled.postprocessor_callback = postprocessor_callback
+        pooled.ydl.params.update(per_call)
+        healthy = False
+        try:
+            yield pooled.ydl
+            healthy = True
+        finally:
+            pooled.callback = None
+            pooled.postprocessor_callback = None
+            for name in per_call:
+                pooled.ydl.params.pop(name, None)
+            if healthy:
+                self._release(key, pooled)
+            else:
+                # Don't hand out an instance left in an unknown state
+                self._discard(pooled)
+
+    def _release(self, key, pooled):
+        evicted = []
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            self._idle.move_to_end(key)
+            if len(idle) < self.max_idle_per_key:
+                idle.append(pooled)
+            else:
+                evicted.append(pooled)
+            # Evict the least recently used option sets
+            while len(self._idle) > self.max_keys:
+                _, old = self._idle.popitem(last=False)
+                evicted.extend(old)
+        for old in evicted:
+            self._discard(old)
+
+    def _discard(self, pooled):
+        with self._lock:
+            self.stats['discarded'] += 1
+        try:
+            pooled.ydl.close()
+        except Exception as e:
+            print(f"Error closing YoutubeDL instance: {e}")
+
+    def close(self):
+        """Close every idle instance"""
+        with self._lock:
+            idle = [pooled for group in self._idle.values() for pooled in group]
+            self._idle.clear()
+        for pooled in idle:
+            self._discard(pooled)
+
+# Shared pool used by all extraction and download functions
+ydl_pool = YoutubeDLPool()
+
+class JobCancelled(yt_dlp.utils.DownloadCancelled):
+    msg = 'Download cancelled'
+
+class JobPaused(yt_dlp.utils.DownloadCancelled):
+    msg = 'Download paused'
+
+class JobControl:
+    """Cooperative cancel/pause signals for a download job.
+    
+    check() is called from the yt-dlp progress hook and raises to stop the
+    transfer. Pausing stops the transfer but keeps the .part file, so the
+    next attempt resumes from that byte offset. Files the hook reports are
+    tracked so a cancel can remove the partial download.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.cancelled = False
+        self.paused = False
+        self.temp_files = set()
+        self.reservation = None  # DiskReservation of the item being downloaded
+
+    def cancel(self):
+        with self._cond:
+            self.cancelled = True
+            self.paused = False
+            self._cond.notify_all()
+
+    def pause(self):
+        with self._cond:
+            if not self.cancelled:
+                self.paused = True
+
+    def resume(self):
+        with self._cond:
+            self.paused = False
+            self._cond.notify_all()
+
+    def check(self, d=None):
+        """Record the hook's files and raise if the job should stop"""
+        # Only files being written by this job; 'finished' alone may be a file that already existed
+        if d and d.get('status') == 'downloading':
+            for key in ('filename', 'tmpfilename'):
+                if d.get(key):
+                    self.temp_files.add(d[key])
+        reservation = self.reservation
+        if d and reservation is not None:
+            reservation.track(d)
+        if self.cancelled:
+            raise JobCancelled()
+        if self.paused:
+            raise JobPaused()
+
+    def wait_while_paused(self):
+        """Block until resumed or cancelled; returns False if cancelled"""
+        with self._cond:
+            while self.paused and not self.cancelled:
+                self._cond.wait()
+            return not self.cancelled
+
+    def sleep(self, seconds):
+        """Wait up to seconds, returning early with False if the job is cancelled"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.cancelled, timeout=seconds)
+            return not self.cancelled
+
+    def forget_files(self):
+        """Call after an item completes so its output is never cleaned up"""
+        self.temp_files.clear()
+
+    def remove_temp_files(self):
+        """Delete partial files left by the interrupted item, then its emptied staging folders"""
+        folders = set()
+        for path in list(self.temp_files):
+            folders.add(os.path.dirname(path))
+            for candidate in (path, path + '.part', path + '.ytdl'):
+                try:
+                    if os.path.isfile(candidate):
+                        os.remove(candidate)
+                except OSError as e:
+                    print(f"Error removing temporary file {candidate}: {e}")
+        self.temp_files.clear()
+        for folder in folders:
+            if os.path.basename(folder) == STAGING_DIR_NAME:
+                remove_staging_dir(os.path.dirname(folder))
+
+# Failure classes for download errors; only the first two are worth retrying
+RETRYABLE_ERRORS = ('throttled', 'network')
+
+ERROR_PATTERNS = [
+    ('throttled', re.compile(r'HTTP Error 429|Too Many Requests|rate[- ]?limit', re.I)),
+    ('unavailable', re.compile(r'Video unavailable|Private video|has been removed|account .* terminated|'
+                               r'members[- ]only|Sign in to confirm|not available in your country|'
+                               r'copyright|HTTP Error 40[34]|HTTP Error 410', re.I)),
+    ('network', re.compile(r'timed? ?out|Connection (reset|refused|aborted)|Remote end closed|'
+                           r'IncompleteRead|Temporary failure in name resolution|Network is unreachable|'
+                           r'EOF occurred|HTTP Error 5\d\d|Unable to download|giving up after', re.I)),
+]
+
+def classify_download_error(error):
+    """Sort an error message into 'throttled', 'network', 'unavailable' or 'permanent'"""
+    message = str(error or '')
+    for cause, pattern in ERROR_PATTERNS:
+        if pattern.search(message):
+            return cause
+    return 'permanent'
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Exponential backoff with jitter for the given retry attempt (0-based)"""
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+# Folder inside the download directory where .part files and merge
+# intermediates are written, so the final move is a same-filesystem rename
+STAGING_DIR_NAME = '.tubesync-tmp'
+
+def download_paths(path):
+    """yt-dlp 'paths' option staging temporary files next to the destination"""
+    return {'home': path, 'temp': os.path.join(path, STAGING_DIR_NAME)}
+
+def remove_staging_dir(path):
+    """Drop the staging folder once nothing is left in it"""
+    try:
+        os.rmdir(os.path.join(path, STAGING_DIR_NAME))
+    except OSError:
+        pass
+
+def estimate_media_size(info, format_id):
+    """Estimated bytes transferred for a full download of format_id (0 if unknown).
+    
+    Uses filesize/filesize_approx and falls back to tbr x duration.
+    """
+    if not info:
+        return 0
+    
+    duration = info.get('duration') or 0
+    formats = {str(fmt.get('format_id')): fmt for fmt in info.get('formats') or []}
+    # Only the preferred alternative counts, not the fallbacks after '/'
+    parts = str(format_id).split('/')[0].split('+')
+    
+    total = 0
+    for part in parts:
+        fmt = formats.get(part) or formats.get(part.replace('_audio', ''))
+        if not fmt:
+            return 0
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if not size and fmt.get('tbr') and duration:
+            size = fmt['tbr'] * 1000 / 8 * duration
+        if not size:
+            return 0
+        total += size
+    return int(total)
+
+def estimate_download_size(info, format_id, extract_audio=False, clip=None):
+    """Estimated peak disk usage in bytes for downloading format_id (0 if unknown).
+    
+    Merged video+audio downloads need room for the parts and the merged file
+    at once; audio extraction needs room for the source and the MP3. Clips
+    are scaled to their share of the duration.
+    """
+    total = estimate_media_size(info, format_id)
+    if not total:
+        return 0
+    
+    duration = info.get('duration') or 0
+    if '+' in str(format_id).split('/')[0]:
+        total *= 2
+    if extract_audio:
+        total += 192 * 1000 / 8 * duration
+    if clip and duration:
+        end = min(clip['end'], duration) if clip.get('end') is not None else duration
+        total *= max(end - clip['start'], 0) / duration
+    return int(total)
+
+def parse_clip_range(start_time, end_time):
+    """Validate clip bounds given as seconds or [HH:]MM:SS; returns (start, end) with end None for 'to the end'"""
+    def to_seconds(value, name):
+        if value in (None, ''):
+            return None
+        seconds = value if isinstance(value, (int, float)) else yt_dlp.utils.parse_duration(str(value))
+        # NaN and infinity compare false against everything, so they would pass the checks below
+        if seconds is None or not math.isfinite(seconds) or seconds < 0:
+            raise ValueError(f'Invalid {name}: {value}')
+        return float(seconds)
+    
+    start = to_seconds(start_time, 'start time') or 0.0
+    end = to_seconds(end_time, 'end time')
+    if end is not None and end <= start:
+        raise ValueError('End time must be after start time')
+    return start, end
+
+def apply_clip_options(ydl_opts, clip):
+    """Restrict a download to clip['start']..clip['end'] seconds.
+    
+    yt-dlp fetches only the fragments/byte ranges covering the section and
+    cuts at the nearest keyframes; frame_accurate re-encodes around the cuts.
+    """
+    if not clip:
+        return ydl_opts
+    end = clip['end'] if clip.get('end') is not None else float('inf')
+    ydl_opts['download_ranges'] = yt_dlp.utils.download_range_func(None, [(clip['start'], end)])
+    ydl_opts['force_keyframes_at_cuts'] = bool(clip.get('frame_accurate'))
+    # Keep clips from overwriting (or being mistaken for) the full download
+    ydl_opts['outtmpl'] = '%(title)s [%(section_start)s-%(section_end)s].%(ext)s'
+    return ydl_opts
+
+class DiskSpaceError(Exception):
+    pass
+
+class DiskReservation:
+    """One admitted job's share of a volume: its estimate minus what it has written.
+    
+    Bytes already on disk have left the free space, so only the part still
+    to be written stays reserved. track() takes yt-dlp progress hook dicts.
+    """
+    def __init__(self, owner, device, nbytes):
+        self._owner = owner
+        self.device = device
+        self.nbytes = nbytes
+        self.reserved = nbytes
+        self._written = {}  # filename -> bytes written so far
+
+    # Smallest change passed on to the shared totals; progress hooks fire many times a second
+    UPDATE_STEP = 1024 * 1024
+
+    def track(self, d):
+        # 'filename' is the final name in both downloading and finished hooks
+        filename = d.get('filename')
+        written = d.get('downloaded_bytes')
+        if d.get('status') == 'finished':
+            written = d.get('total_bytes') or written
+        if not filename or not written or written <= self._written.get(filename, 0):
+            return
+        self._written[filename] = written
+        remaining = max(self.nbytes - sum(self._written.values()), 0)
+        if self.reserved - remaining >= self.UPDATE_STEP or (remaining == 0 and self.reserved):
+            self._owner._set_reserved(self, remaining)
+
+class DiskSpaceReservations:
+    """Admission control for downloads based on free space per filesystem.
+    
+    Each job reserves its estimated size before it starts; a job is held
+    until free space minus what running jobs still have to write on the
+    same device covers it. Free space is re-read on every check, so space
+    freed outside the app also releases held jobs.
+    """
+    # Space left untouched on every volume
+    SAFETY_MARGIN = 256 * 1024 * 1024
+    # Seconds between free-space checks while a job is held
+    RECHECK_INTERVAL = 2
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._reserved = {}  # st_dev -> reserved bytes not yet written
+
+    @staticmethod
+    def _existing_path(path):
+        path = os.path.abspath(path)
+        while not os.path.exists(path):
+            parent = os.path.dirname(path)
+            if parent == path:
+                break
+            path = parent
+        return path
+
+    @contextmanager
+    def reserve(self, path, nbytes, control=None, on_hold=None):
+        """Hold the caller until nbytes fit on path's volume, then keep them reserved.
+        
+        Yields the DiskReservation, or False if the job was cancelled while
+        held. While admitted it is also control.reservation, so the job's
+        progress hooks shrink it as the download writes. on_hold is called
+        with (needed, available) each time the job has to wait.
+        """
+        path = self._existing_path(path)
+        device = os.stat(path).st_dev
+        capacity = shutil.disk_usage(path).total - self.SAFETY_MARGIN
+        if nbytes > capacity:
+            raise DiskSpaceError(f'Not enough disk space: download needs about {nbytes / (1024 * 1024):.0f}MB, '
+                                 f'the volume only holds {max(capacity, 0) / (1024 * 1024):.0f}MB')
+        
+        with self._cond:
+            while True:
+                if control is not None and control.cancelled:
+                    admitted = False
+                    break
+                available = shutil.disk_usage(path).free - self._reserved.get(device, 0) - self.SAFETY_MARGIN
+                if nbytes <= available:
+                    self._reserved[device] = self._reserved.get(device, 0) + nbytes
+                    admitted = DiskReservation(self, device, nbytes)
+                    break
+                if on_hold:
+                    on_hold(nbytes, available)
+                self._cond.wait(self.RECHECK_INTERVAL)
+        
+        if not admitted:
+            yield False
+            return
+        if control is not None:
+            control.reservation = admitted
+        try:
+            yield admitted
+        finally:
+            if control is not None:
+                control.reservation = None
+            self._set_reserved(admitted, 0)
+
+    def _set_reserved(self, reservation, nbytes):
+        with self._cond:
+            self._reserved[reservation.device] += nbytes - reservation.reserved
+            reservation.reserved = nbytes
+            if not self._reserved[reservation.device]:
+                del self._reserved[reservation.device]
+            # Held jobs may fit now
+            self._cond.notify_all()
+
+disk_reservations = DiskSpaceReservations()
+
 def get_video_info(url):
     """Get video information from YouTube URL"""
     try:
@@ -17,7 +463,7 @@ def get_video_info(url):
             'extract_flat': False,
         }
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with ydl_pool.acquire(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
             return info
             
@@ -25,6 +471,175 @@ def get_video_info(url):
         print(f"Error getting video info: {e}")
         return None
 
+# Info dict keys returned from worker processes. Everything else (fragment
+# lists, subtitles, heatmaps, raw player responses) is unused by the app and
+# only costs pickling time in the server process.
+TRIMMED_INFO_KEYS = ('id', 'title', 'duration', 'uploader', 'thumbnail', 'view_count', 'webpage_url',
+                     'url', 'original_url', '_type', 'playlist_count', 'extractor', 'extractor_key')
+TRIMMED_FORMAT_KEYS = ('format_id', 'ext', 'vcodec', 'acodec', 'height', 'width', 'fps', 'abr', 'tbr',
+                       'vbr', 'filesize', 'filesize_approx', 'format_note', 'protocol')
+
+def trim_info(info):
+    """Reduce an info dict (and its playlist entries) to the fields the app reads"""
+    if not info:
+        return info
+    trimmed = {key: info[key] for key in TRIMMED_INFO_KEYS if key in info}
+    if info.get('formats'):
+        trimmed['formats'] = [{key: fmt[key] for key in TRIMMED_FORMAT_KEYS if key in fmt}
+                              for fmt in info['formats']]
+    if info.get('entries') is not None:
+        trimmed['entries'] = [trim_info(entry) for entry in info['entries'] if entry]
+    return trimmed
+
+def _extract_trimmed_info(url):
+    """Worker process entry point"""
+    return trim_info(get_video_info(url))
+
+class ExtractionProcessPool:
+    """Runs get_video_info in worker processes so extraction does not hold the
+    server's GIL while downloads are running.
+    
+    Disabled (extraction stays in the calling thread) unless processes > 0;
+    set TUBESYNC_EXTRACTION_PROCESSES to enable it. Workers are started with
+    'spawn' on first use and each keeps its own YoutubeDL pool.
+    """
+    def __init__(self, processes=0):
+        self.processes = processes
+        self._lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def enabled(self):
+        return self.processes > 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processes,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def extract(self, url):
+        """Info for url - trimmed when it came from a worker process, None on failure"""
+        if not self.enabled:
+            return get_video_info(url)
+        
+        executor = self._get_executor()
+        try:
+            return executor.submit(_extract_trimmed_info, url).result()
+        except Exception as e:
+            # A crashed worker breaks the whole executor; start a fresh one next time
+            print(f"Error in extraction process: {e}")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            return None
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+EXTRACTION_PROCESSES_ENV = 'TUBESYNC_EXTRACTION_PROCESSES'
+
+def extraction_pool_from_env():
+    """ExtractionProcessPool sized by TUBESYNC_EXTRACTION_PROCESSES; disabled when unset or invalid"""
+    value = os.environ.get(EXTRACTION_PROCESSES_ENV)
+    try:
+        processes = int(value or 0)
+    except ValueError:
+        print(f"Extraction processes disabled: {EXTRACTION_PROCESSES_ENV}={value!r} is not a whole number")
+        processes = 0
+    return ExtractionProcessPool(processes)
+
+extraction_pool = extraction_pool_from_env()
+
+class VideoInfoCache:
+    """Short-lived, single-flight cache of extracted video info.
+    
+    prefetch() starts extraction on a small background pool; get() returns a
+    fresh cached result, joins an extraction already in flight for the same
+    URL, or extracts in the calling thread. Failed extractions are not cached.
+    """
+    def __init__(self, ttl=600, max_entries=32, prefetch_workers=2):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # url -> (Future, created_at)
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers,
+                                            thread_name_prefix='tubesync-prefetch')
+        self.stats = {'hits': 0, 'misses': 0, 'prefetched': 0}
+
+    def _lookup(self, url):
+        """Return the live future for url, dropping stale or failed entries (lock held)"""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        future, created_at = entry
+        if future.done():
+            if (future.cancelled() or future.exception() is not None or
+                    future.result() is None or time.time() - created_at > self.ttl):
+                del self._entries[url]
+                return None
+        self._entries.move_to_end(url)
+        return future
+
+    def _store(self, url, future):
+        self._entries[url] = (future, time.time())
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def prefetch(self, url):
+        """Start extracting url in the background; returns False if already cached or running"""
+        with self._lock:
+            if self._lookup(url) is not None:
+                return False
+            self._store(url, self._executor.submit(extraction_pool.extract, url))
+            self.stats['prefetched'] += 1
+        return True
+
+    def peek(self, url, wait=False):
+        """Cached info for url without extracting: None unless extraction finished,
+        or with wait also an extraction that is already queued or running"""
+        with self._lock:
+            future = self._lookup(url)
+        if future is None or not (wait or future.done()):
+            return None
+        return future.result()
+
+    def get(self, url):
+        """Get video info for url, sharing any prefetch that is already running"""
+        with self._lock:
+            future = self._lookup(url)
+            if future is not None and not future.running() and not future.done() and future.cancel():
+                # Still queued behind other prefetches - extract here instead
+                future = None
+            if future is None:
+                owner = True
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._store(url, future)
+                self.stats['misses'] += 1
+            else:
+                owner = False
+                self.stats['hits'] += 1
+        
+        if not owner:
+            return future.result()
+        
+        info = None
+        try:
+            info = extraction_pool.extract(url)
+        finally:
+            future.set_result(info)
+        return info
+
+# Shared info cache used by the API routes and playlist jobs
+video_info_cache = VideoInfoCache()
+
 def get_available_formats(info):
     """Extract available video and audio formats"""
     try:
@@ -346,28 +961,356 @@ def get_downloadable_video_formats(video_formats, audio_formats):
         print(f"Error creating downloadable formats: {e}")
         return []
 
-def download_video(url, format_id, path, callback=None):
-    """Download video with specified format"""
+# Keys kept in the compact format schema sent to the UI. Labels such as
+# resolution/quality/description/audio_info are derived client-side.
+COMPACT_FORMAT_KEYS = ('format_id', 'ext', 'download_type', 'height', 'width', 'fps',
+                       'vcodec', 'acodec', 'abr', 'tbr', 'filesize')
+
+def compact_formats(downloadable_formats):
+    """De-duplicate downloadable formats and strip them to the compact schema"""
+    compact = []
+    seen = set()
+    for fmt in downloadable_formats:
+        format_id = str(fmt.get('format_id', ''))
+        if not format_id or format_id in seen:
+            continue
+        seen.add(format_id)
+
+        entry = {}
+        for key in COMPACT_FORMAT_KEYS:
+            value = fmt.get(key)
+            # Drop empty values - the UI falls back to sensible defaults
+            if value in (None, '', 0, 'none', 'Unknown'):
+                continue
+            if isinstance(value, float):
+                value = round(value, 1)
+                if value.is_integer():
+                    value = int(value)
+            entry[key] = value
+        entry['format_id'] = format_id
+        compact.append(entry)
+    return compact
+
+def entry_upload_date(entry):
+    """Upload day of a (flat) entry as YYYYMMDD, or None when the listing does not say"""
+    if entry.get('upload_date'):
+        return entry['upload_date']
+    timestamp = entry.get('timestamp') or entry.get('release_timestamp')
+    if timestamp:
+        return time.strftime('%Y%m%d', time.gmtime(timestamp))
+    return None
+
+def compact_playlist_entry(entry):
+    """Strip a playlist entry to the fields the UI needs, dropping empty values.
+    
+    Thumbnails are not included - the UI loads them through /api/thumb/<id>.
+    """
+    url = entry.get('url', '')
+    webpage_url = entry.get('webpage_url', '')
+    compact = {
+        'id': entry.get('id', ''),
+        'title': entry.get('title', 'Unknown Title'),
+        'duration': entry.get('duration'),
+        'uploader': entry.get('uploader'),
+        'url': url or webpage_url,
+        # webpage_url is only sent when it differs from url
+        'webpage_url': webpage_url if webpage_url and webpage_url != url else None,
+        'upload_date': entry_upload_date(entry),
+    }
+    return {key: value for key, value in compact.items() if value not in (None, '', 0)}
+
+CHANNEL_URL_PATTERN = re.compile(r'^(https?://(?:www\.|m\.)?youtube\.com/(?:@[^/?#]+|channel/[^/?#]+|c/[^/?#]+|user/[^/?#]+))/?(?:[?#].*)?$')
+
+def sync_listing_url(url):
+    """Listing URL for a sync subscription; bare channel URLs map to their uploads tab"""
+    match = CHANNEL_URL_PATTERN.match(url.strip())
+    if match:
+        return match.group(1) + '/videos'
+    return url.strip()
+
+def is_newest_first(url):
+    """Channel tabs list newest uploads first; playlists list in playlist order (oldest additions first)"""
+    return 'list=' not in url
+
+# Flat listing: entries come back as URL stubs and are not resolved
+LISTING_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': 'in_playlist',
+}
+
+def _open_listing(ydl, url):
+    """Unprocessed playlist result for url; its entries are a lazy generator"""
+    result = ydl.extract_info(url, download=False, process=False)
+    # Follow redirects (e.g. a handle URL resolving to a channel tab) without processing
+    for _ in range(3):
+        if not result or result.get('_type') not in ('url', 'url_transparent'):
+            break
+        result = ydl.extract_info(result['url'], download=False, process=False, ie_key=result.get('ie_key'))
+    if not result or result.get('_type') not in ('playlist', 'multi_video'):
+        raise ValueError('URL is not a playlist or channel')
+    return result
+
+def iter_playlist_entries(url, max_entries=None):
+    """Yield compact playlist entries while the extractor is still paging.
+    
+    Nothing is collected up front: each page is fetched only when the
+    caller asks for an entry beyond it. Raises on extraction errors.
+    """
+    with ydl_pool.acquire(LISTING_OPTS) as ydl:
+        result = _open_listing(ydl, url)
+        count = 0
+        for entry in result.get('entries') or []:
+            if not entry or not (entry.get('url') or entry.get('webpage_url')):
+                continue
+            yield compact_playlist_entry(entry)
+            count += 1
+            if max_entries and count >= max_entries:
+                break
+
+def read_ahead(iterable, size):
+    """Iterate iterable on a background thread, keeping at most size items buffered.
+    
+    Lets a slow producer (playlist listing) run while the consumer works,
+    with bounded memory. Producer errors are raised in the consumer once
+    the items before them have been consumed.
+    """
+    buffer = queue.Queue(maxsize=size)
+    stop = threading.Event()
+    end = object()
+    
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put((item, None)):
+                    return
+            put((end, None))
+        except Exception as e:
+            put((end, e))
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+    
+    threading.Thread(target=produce, name='tubesync-read-ahead', daemon=True).start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # Consumer finished or gave up; let the producer exit and release its YoutubeDL
+        stop.set()
+
+# New entries returned when a sync's known video IDs are not found in the listing
+SYNC_UNMATCHED_LIMIT = 100
+
+def list_entries_since(url, watermark=None, newest_first=True, max_entries=None, since_date=None):
+    """Flat-list playlist/channel entries added after the last synced videos.
+    
+    watermark is the ID of the last synced video or a list of recently
+    synced IDs; any of them marks where new entries end, so one deleted or
+    privated video does not lose the position. For newest-first listings
+    since_date (YYYYMMDD of the newest synced upload) also stops the walk
+    at entries uploaded more than a day before it. When there is a
+    watermark but none of its IDs show up, at most SYNC_UNMATCHED_LIMIT of
+    the newest entries are returned (unless max_entries is set) rather
+    than the whole channel again.
+    
+    Entries are pulled lazily from the extractor, so a newest-first listing
+    only fetches pages until it reaches the watermark. Oldest-first
+    playlists have to be walked to the end. Returns compact entries,
+    oldest first; raises on extraction errors.
+    """
+    if isinstance(watermark, str):
+        watermark = [watermark]
+    known = set(watermark or [])
+    limit = max_entries or (SYNC_UNMATCHED_LIMIT if known else None)
+    cutoff = None
+    if newest_first and since_date:
+        try:
+            # A day of slack for upload dates reported in another time zone
+            cutoff = (datetime.strptime(since_date, '%Y%m%d') - timedelta(days=1)).strftime('%Y%m%d')
+        except ValueError:
+            cutoff = None
+    
+    new_entries = []
+    found = False
+    with ydl_pool.acquire(LISTING_OPTS) as ydl:
+        result = _open_listing(ydl, url)
+        for entry in result.get('entries') or []:
+            video_id = entry.get('id') if entry else None
+            if not video_id:
+                continue
+            if video_id in known:
+                found = True
+                if newest_first:
+                    break
+                # Everything listed so far was synced on an earlier run
+                new_entries = []
+                continue
+            compact = compact_playlist_entry(entry)
+            if cutoff and compact.get('upload_date') and compact['upload_date'] < cutoff:
+                found = True
+                break
+            new_entries.append(compact)
+            if newest_first and limit and len(new_entries) >= limit:
+                break
+    
+    unmatched = known and not found and not max_entries
+    if unmatched:
+        print(f"None of {len(known)} synced videos found in {url}; taking at most {limit} of the newest entries")
+    if newest_first:
+        new_entries.reverse()
+    elif max_entries:
+        new_entries = new_entries[:max_entries]
+    elif unmatched:
+        new_entries = new_entries[-limit:]
+    return new_entries
+
+# Cached stream URLs must stay valid at least this long to be reused (seconds)
+STREAM_URL_MIN_TTL = 300
+STREAM_EXPIRE_PATTERN = re.compile(r'[?&/]expire[=/](\d+)')
+STALE_URL_PATTERN = re.compile(r'HTTP Error (403|410)|Forbidden|expired', re.IGNORECASE)
+
+def reusable_info(info):
+    """info if it can be downloaded without extracting again, otherwise None.
+    
+    Needs full format entries (trimmed info from the extraction processes
+    has no stream URLs) whose signed URLs are not about to expire.
+    """
+    if not info or info.get('_type', 'video') != 'video' or not info.get('formats'):
+        return None
+    deadline = time.time() + STREAM_URL_MIN_TTL
+    for fmt in info['formats']:
+        if not fmt.get('url'):
+            return None
+        match = STREAM_EXPIRE_PATTERN.search(fmt['url'])
+        if match and int(match.group(1)) < deadline:
+            return None
+    return info
+
+def download_from_info(ydl, url, info=None):
+    """Download with ydl from the cached info dict, or from url when it is unusable.
+    
+    A 403/410 from a cached stream URL means it went stale after all; the
+    download is then retried with a fresh extraction, resuming any partial
+    file, the same way yt-dlp handles --load-info-json.
+    """
+    info = reusable_info(info)
+    if info is not None:
+        try:
+            # sanitize_info copies the shared dict and drops the previous run's selections
+            ydl.process_ie_result(ydl.sanitize_info(info, True), download=True)
+            return
+        except yt_dlp.utils.DownloadError as e:
+            if not STALE_URL_PATTERN.search(str(e)):
+                raise
+            print(f"Cached stream URLs rejected, extracting again: {e}")
+    ydl.download([url])
+
+# Shared store of finished files, enabled by TUBESYNC_MEDIA_STORE
+media_store = media_store_from_env()
+
+YOUTUBE_ID_PATTERN = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/live/)([A-Za-z0-9_-]{11})')
+# Options that change the produced file and therefore its store key
+STORE_KEY_OPTIONS = ('postprocessors', 'download_ranges', 'force_keyframes_at_cuts')
+
+def video_id_for(url, info=None):
+    """Video ID from the info dict, or parsed from a YouTube URL"""
+    if info and info.get('_type', 'video') == 'video' and info.get('id'):
+        return info['id']
+    match = YOUTUBE_ID_PATTERN.search(url or '')
+    return match.group(1) if match else None
+
+def run_download(url, format_id, path, ydl_opts, callback=None, postprocessor_callback=None, info=None):
+    """Download url into path with ydl_opts, going through the media store when enabled.
+    
+    Returns (final file path or None, delivery method). The method is None
+    for a real download, or how the stored copy was placed in path
+    (reflink, hardlink, copy or existing).
+    """
+    store_key = None
+    video_id = video_id_for(url, info) if media_store is not None else None
+    if video_id:
+        settings = {key: ydl_opts[key] for key in STORE_KEY_OPTIONS if ydl_opts.get(key)}
+        store_key = media_key(video_id, format_id, settings)
+        delivered = media_store.deliver(store_key, path)
+        if delivered:
+            print(f"Delivered {video_id} ({format_id}) from the media store by {delivered[1]}")
+            return delivered
+    
+    # MoveFiles runs last; its hook still sees the staging path, plus the folder it moves to
+    final_paths = []
+    def on_postprocess(d):
+        if d.get('status') == 'finished' and d.get('postprocessor') == 'MoveFiles':
+            moved = d.get('info_dict') or {}
+            if moved.get('filepath'):
+                final_dir = moved.get('__finaldir') or path
+                final_paths.append(os.path.join(final_dir, os.path.basename(moved['filepath'])))
+        if postprocessor_callback:
+            postprocessor_callback(d)
+    
+    try:
+        with ydl_pool.acquire(ydl_opts, callback, on_postprocess) as ydl:
+            download_from_info(ydl, url, info)
+    finally:
+        remove_staging_dir(path)
+    
+    filepath = final_paths[-1] if final_paths else None
+    if store_key and filepath and os.path.isfile(filepath):
+        media_store.add(store_key, filepath, video_id=video_id, format_id=format_id,
+                        title=(info or {}).get('title'))
+    return filepath, None
+
+def format_with_fallback(format_id, download_type='video'):
+    """Extend a format selector so videos lacking that exact format still download"""
+    if '/' in format_id:
+        return format_id
+    if download_type in ('audio', 'raw'):
+        return f"{format_id}/bestaudio/best"
+    return f"{format_id}/bestvideo+bestaudio/best"
+
+def download_video(url, format_id, path, callback=None, clip=None, postprocessor_callback=None, info=None):
+    """Download video with specified format.
+    
+    info is the already-extracted info dict for url, if any; its stream URLs
+    are used directly while they are still valid.
+    """
     try:
         if not os.path.exists(path):
             os.makedirs(path)
         
         ydl_opts = {
             'format': format_id,
-            'outtmpl': os.path.join(path, '%(title)s.%(ext)s'),
-            'progress_hooks': [callback] if callback else [],
+            'outtmpl': '%(title)s.%(ext)s',
+            'paths': download_paths(path),
         }
+        apply_clip_options(ydl_opts, clip)
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        filepath, delivered = run_download(url, format_id, path, ydl_opts, callback, postprocessor_callback, info)
         
-        return {'success': True, 'message': 'Video downloaded successfully'}
+        message = f'Video delivered from the media store ({delivered})' if delivered else 'Video downloaded successfully'
+        return {'success': True, 'message': message, 'filepath': filepath, 'delivered': delivered}
         
     except Exception as e:
         print(f"Error downloading video: {e}")
         return {'success': False, 'error': str(e)}
 
-def download_audio(url, format_id, path, callback=None):
+def download_audio(url, format_id, path, callback=None, clip=None, postprocessor_callback=None, info=None):
     """Download audio with specified format and convert to MP3"""
     try:
         if not os.path.exists(path):
@@ -375,25 +1318,26 @@ def download_audio(url, format_id, path, callback=None):
         
         ydl_opts = {
             'format': format_id,
-            'outtmpl': os.path.join(path, '%(title)s.%(ext)s'),
+            'outtmpl': '%(title)s.%(ext)s',
+            'paths': download_paths(path),
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
                 'preferredquality': '192',
             }],
-            'progress_hooks': [callback] if callback else [],
         }
+        apply_clip_options(ydl_opts, clip)
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        filepath, delivered = run_download(url, format_id, path, ydl_opts, callback, postprocessor_callback, info)
         
-        return {'success': True, 'message': 'Audio downloaded successfully as MP3'}
+        message = f'Audio delivered from the media store ({delivered})' if delivered else 'Audio downloaded successfully as MP3'
+        return {'success': True, 'message': message, 'filepath': filepath, 'delivered': delivered}
         
     except Exception as e:
         print(f"Error downloading audio: {e}")
         return {'success': False, 'error': str(e)}
 
-def download_audio_raw(url, format_id, path, callback=None):
+def download_audio_raw(url, format_id, path, callback=None, clip=None, postprocessor_callback=None, info=None):
     """Download raw audio and convert to MP3"""
     try:
         if not os.path.exists(path):
@@ -401,24 +1345,31 @@ def download_audio_raw(url, format_id, path, callback=None):
         
         ydl_opts = {
             'format': format_id,
-            'outtmpl': os.path.join(path, '%(title)s.%(ext)s'),
+            'outtmpl': '%(title)s.%(ext)s',
+            'paths': download_paths(path),
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'mp3',
                 'preferredquality': '192',
             }],
-            'progress_hooks': [callback] if callback else [],
         }
+        apply_clip_options(ydl_opts, clip)
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        filepath, delivered = run_download(url, format_id, path, ydl_opts, callback, postprocessor_callback, info)
         
-        return {'success': True, 'message': 'Raw audio downloaded successfully as MP3'}
+        message = f'Raw audio delivered from the media store ({delivered})' if delivered else 'Raw audio downloaded successfully as MP3'
+        return {'success': True, 'message': message, 'filepath': filepath, 'delivered': delivered}
         
     except Exception as e:
         print(f"Error downloading raw audio: {e}")
         return {'success': False, 'error': str(e)}
 
+def is_single_video_url(url):
+    """True for a URL naming one video; playlist (list=) and channel URLs are not"""
+    if not is_valid_youtube_url(url) or re.search(r'[?&]list=', url):
+        return False
+    return YOUTUBE_ID_PATTERN.search(url) is not None
+
 def is_valid_youtube_url(url):
     """Check if URL is a valid YouTube URL"""
     try:
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+TubeSync Benchmark - in-thread vs process-pool extraction under download load
+
+Serves a large DASH manifest from a local HTTP server (parsing it is CPU
+bound, like a real YouTube extraction) and runs simulated download threads
+that spend their time in Python, the way yt-dlp progress hooks do. While
+that load runs, one thread extracts info repeatedly and another polls a
+Flask /api/progress route. Latency percentiles are reported for both, with
+extraction in the server process and in an ExtractionProcessPool.
+
+Usage: python benchmarks/bench_extract_processes.py [seconds_per_mode] [download_threads]
+"""
+
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify
+import backend
+
+def make_manifest(representations=30, segments=400):
+    parts = ['<?xml version="1.0"?><MPD xmlns="urn:mpeg:dash:schema:mpd:2011" type="static" '
+             'mediaPresentationDuration="PT2000S" minBufferTime="PT2S" '
+             'profiles="urn:mpeg:dash:profile:isoff-on-demand:2011"><Period><AdaptationSet mimeType="video/mp4">']
+    for r in range(representations):
+        parts.append(f'<Representation id="v{r}" codecs="avc1.640028" width="{256 + r * 32}" height="{144 + r * 18}" '
+                     f'bandwidth="{200000 + r * 100000}"><SegmentList duration="5" timescale="1">'
+                     f'<Initialization sourceURL="v{r}/init.mp4"/>')
+        parts.extend(f'<SegmentURL media="v{r}/{s}.m4s"/>' for s in range(segments))
+        parts.append('</SegmentList></Representation>')
+    parts.append('</AdaptationSet></Period></MPD>')
+    return ''.join(parts).encode('utf-8')
+
+MANIFEST = make_manifest()
+
+class ManifestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/dash+xml')
+        self.send_header('Content-Length', str(len(MANIFEST)))
+        self.end_headers()
+        self.wfile.write(MANIFEST)
+
+    def log_message(self, *args):
+        pass
+
+def simulated_download(stop):
+    """Python-heavy loop standing in for a download thread and its progress hooks"""
+    downloaded = 0
+    while not stop.is_set():
+        for _ in range(200):
+            downloaded += 16384
+            d = {'status': 'downloading', 'downloaded_bytes': downloaded, 'total_bytes': 10 ** 9,
+                 'speed': 1.5e6, 'eta': 600, 'filename': 'video.mp4'}
+            json.dumps({'progress': min(d['downloaded_bytes'] / d['total_bytes'] * 100, 100)})
+        time.sleep(0.001)
+
+def percentiles(samples):
+    if not samples:
+        return 'n/a'
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return f"p50={statistics.median(samples) * 1000:6.1f}ms p95={p95 * 1000:6.1f}ms n={len(samples)}"
+
+def run(label, pool, url, seconds, download_threads):
+    app = Flask(__name__)
+
+    @app.route('/api/progress/<download_id>')
+    def progress(download_id):
+        return jsonify({'status': 'downloading', 'progress': 42.0, 'message': 'Downloading... 42.0%'})
+
+    client = app.test_client()
+    stop = threading.Event()
+    extract_times, progress_times = [], []
+
+    def extractor():
+        n = 0
+        while not stop.is_set():
+            n += 1
+            start = time.perf_counter()
+            info = pool.extract(f'{url}?n={n}')
+            extract_times.append(time.perf_counter() - start)
+            assert info and info.get('formats')
+
+    def prober():
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get('/api/progress/bench')
+            progress_times.append(time.perf_counter() - start)
+            time.sleep(0.02)
+
+    threads = [threading.Thread(target=simulated_download, args=(stop,)) for _ in range(download_threads)]
+    threads += [threading.Thread(target=extractor), threading.Thread(target=prober)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f"  {label}")
+    print(f"    /api/video-info extraction  {percentiles(extract_times)}")
+    print(f"    /api/progress               {percentiles(progress_times)}")
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    download_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ManifestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/manifest.mpd'
+
+    in_thread = backend.ExtractionProcessPool(0)
+    processes = backend.ExtractionProcessPool(2)
+    try:
+        # Start the workers and warm both paths before timing
+        in_thread.extract(url)
+        processes.extract(url)
+        print(f"{download_threads} simulated downloads, {seconds:.0f}s per mode, manifest {len(MANIFEST):,}B")
+        run('extraction in server process', in_thread, url, seconds, download_threads)
+        run('extraction in process pool (2 workers)', processes, url, seconds, download_threads)
+    finally:
+        processes.close()
+        backend.ydl_pool.close()
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+TubeSync Benchmark - /api/video-info payload size
+
+Builds a synthetic yt-dlp info dict shaped like a real YouTube response and
+compares the legacy format payload (full schema + duplicated audio formats)
+with the compact schema, raw and compressed.
+
+Usage: python benchmarks/bench_payload.py [playlist_entries]
+"""
+
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import get_available_formats, get_downloadable_video_formats, compact_formats, compact_playlist_entry
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def make_info(video_id='dQw4w9WgXcQ'):
+    """Synthetic single-video info dict with a typical YouTube format ladder"""
+    formats = []
+    for abr, ext, acodec in [(48, 'webm', 'opus'), (70, 'webm', 'opus'), (129, 'm4a', 'mp4a.40.2'), (160, 'webm', 'opus')]:
+        formats.append({'format_id': f'a{abr}', 'ext': ext, 'acodec': acodec, 'vcodec': 'none',
+                        'abr': abr, 'filesize': abr * 27000, 'format_note': 'audio only'})
+    fid = 100
+    for height in [144, 240, 360, 480, 720, 1080, 1440, 2160]:
+        for fps in [30, 60] if height >= 720 else [30]:
+            for ext, vcodec in [('mp4', 'avc1.64001F'), ('webm', 'vp9')]:
+                fid += 1
+                formats.append({'format_id': str(fid), 'ext': ext, 'vcodec': vcodec, 'acodec': 'none',
+                                'height': height, 'width': height * 16 // 9, 'fps': fps,
+                                'tbr': height * 2.5, 'vbr': height * 2.5, 'filesize': height * 90000})
+    formats.append({'format_id': '18', 'ext': 'mp4', 'vcodec': 'avc1.42001E', 'acodec': 'mp4a.40.2',
+                    'height': 360, 'width': 640, 'fps': 30, 'abr': 96, 'tbr': 600, 'filesize': 2_000_000})
+    return {'id': video_id, 'title': 'Benchmark video', 'duration': 212, 'formats': formats}
+
+def legacy_formats(info):
+    """Format list as produced before the compact schema (audio formats appended twice)"""
+    video_formats, audio_formats = get_available_formats(info)
+    downloadable = get_downloadable_video_formats(video_formats, audio_formats)
+    for audio_fmt in audio_formats:
+        abr = audio_fmt.get('abr', 0)
+        quality_label = f"{abr}kbps" if abr else "Unknown"
+        downloadable.append({
+            'format_id': audio_fmt['format_id'], 'ext': audio_fmt.get('ext', 'mp3'),
+            'resolution': 'Audio Only', 'resolution_precise': 'Audio Only',
+            'filesize': audio_fmt.get('filesize', 0), 'vcodec': 'none',
+            'acodec': audio_fmt.get('acodec', 'Unknown'), 'fps': 0, 'height': 0, 'width': 0,
+            'download_type': 'audio_only', 'description': f"Audio Only - {quality_label}",
+            'tbr': 0, 'vbr': 0, 'abr': abr, 'quality': quality_label
+        })
+    return downloadable
+
+def payload(formats, entries, compact=False):
+    if compact:
+        entries = [compact_playlist_entry(entry) for entry in entries]
+    return json.dumps({
+        'title': 'Benchmark', 'formats': formats, 'is_playlist': bool(entries),
+        'playlist_entries': entries
+    }, separators=(',', ':')).encode('utf-8')
+
+def sizes(data):
+    result = {'raw': len(data), 'gzip': len(gzip.compress(data, compresslevel=6))}
+    if brotli is not None:
+        result['br'] = len(brotli.compress(data, quality=5))
+    return result
+
+def main():
+    entry_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    info = make_info()
+    entries = [{'id': f'vid{i:08d}', 'title': f'Playlist entry number {i}', 'duration': 200 + i,
+                'thumbnail': f'https://i.ytimg.com/vi/vid{i:08d}/hqdefault.jpg', 'uploader': 'Benchmark Channel',
+                'url': f'https://www.youtube.com/watch?v=vid{i:08d}',
+                'webpage_url': f'https://www.youtube.com/watch?v=vid{i:08d}'} for i in range(entry_count)]
+
+    # Silence the debug output from the format helpers
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        legacy = legacy_formats(info)
+        video_formats, audio_formats = get_available_formats(info)
+        compact = compact_formats(get_downloadable_video_formats(video_formats, audio_formats))
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"Formats: legacy={len(legacy)} compact={len(compact)} (playlist entries: {entry_count})")
+    for label, formats in [('legacy', legacy), ('compact', compact)]:
+        result = sizes(payload(formats, entries, compact=label == 'compact'))
+        print(f"  {label:8s} " + "  ".join(f"{k}={v:,}B" for k, v in result.items()))
+
+if __name__ == '__main__':
+    main()
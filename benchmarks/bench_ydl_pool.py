@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+TubeSync Benchmark - pooled vs per-call YoutubeDL
+
+Serves a small media file from a local keep-alive HTTP server and measures
+the per-call cost of get_video_info/download_video with a fresh YoutubeDL
+per call (the old behaviour) versus the shared ydl_pool. The server counts
+TCP connections so connection reuse is visible.
+
+Usage: python benchmarks/bench_ydl_pool.py [iterations]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yt_dlp
+import backend
+
+MEDIA = os.urandom(256 * 1024)
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        MediaHandler.connections += 1
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        self._send_headers()
+        self.wfile.write(MEDIA)
+
+    def _send_headers(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(MEDIA)))
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def run(label, iterations, call):
+    MediaHandler.connections = 0
+    start = time.perf_counter()
+    for i in range(iterations):
+        call(i)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:28s} {elapsed / iterations * 1000:7.1f} ms/call  connections={MediaHandler.connections}")
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MediaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/media.mp4'
+    workdir = tempfile.mkdtemp(prefix='tubesync-bench-')
+    info_opts = {'quiet': True, 'no_warnings': True, 'extract_flat': False}
+    download_opts = {'quiet': True, 'no_warnings': True, 'noprogress': True, 'format': 'best',
+                     'outtmpl': os.path.join(workdir, '%(title)s.%(ext)s')}
+
+    def fresh_info(i):
+        with yt_dlp.YoutubeDL(info_opts) as ydl:
+            ydl.extract_info(url, download=False)
+
+    def pooled_info(i):
+        with backend.ydl_pool.acquire(info_opts) as ydl:
+            ydl.extract_info(url, download=False)
+
+    def fresh_download(i):
+        with yt_dlp.YoutubeDL(dict(download_opts, outtmpl=os.path.join(workdir, f'fresh{i}.%(ext)s'))) as ydl:
+            ydl.download([url])
+
+    def pooled_download(i):
+        # Same option set every call, as in a playlist job
+        with backend.ydl_pool.acquire(download_opts) as ydl:
+            ydl.download([url])
+        for name in os.listdir(workdir):
+            if not name.startswith('fresh'):
+                os.remove(os.path.join(workdir, name))
+
+    try:
+        print(f"{iterations} calls against {url}")
+        run('extract: fresh YoutubeDL', iterations, fresh_info)
+        run('extract: pooled YoutubeDL', iterations, pooled_info)
+        run('download: fresh YoutubeDL', iterations, fresh_download)
+        run('download: pooled YoutubeDL', iterations, pooled_download)
+        print(f"  pool stats: {backend.ydl_pool.stats}")
+    finally:
+        backend.ydl_pool.close()
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
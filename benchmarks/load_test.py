@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+TubeSync Benchmark - end-to-end load test against a local media server
+
+Runs the real TubeSync Flask app on a local port with StubIE answering
+YouTube URLs from recordings served by MediaServer, then keeps a fixed
+number of simulated users busy: each analyzes a video (/api/video-info),
+starts a download (/api/download) and polls /api/progress until the job
+finishes. Reports job throughput, download bandwidth, API latency
+percentiles and how memory and per-job state grow over the run.
+
+Usage: python benchmarks/load_test.py [--concurrency N] [--duration S] [--throttle KBPS]
+                                      [--failure-rate P] [--reset-rate P] [--recording FILE]
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from werkzeug.serving import make_server
+
+import backend
+import stub_extractor
+from media_server import MediaServer
+
+FINISHED_STATUSES = ('completed', 'completed_with_errors', 'error', 'cancelled')
+
+def rss_bytes():
+    """Current resident set size, or peak RSS where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return 0
+
+def percentiles(samples):
+    if not samples:
+        return 'n/a'
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(len(samples) * q))]
+    return (f"p50={pick(0.5) * 1000:7.1f}ms p95={pick(0.95) * 1000:7.1f}ms "
+            f"p99={pick(0.99) * 1000:7.1f}ms n={len(samples)}")
+
+class LoadDriver:
+    """Simulated users sharing one TubeSync instance"""
+    def __init__(self, base_url, video_ids, download_path, format_id, poll_interval):
+        self.base_url = base_url
+        self.video_ids = video_ids
+        self.download_path = download_path
+        self.format_id = format_id
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+        self.latencies = {'video-info': [], 'download': [], 'progress': []}
+        self.http_errors = {}
+        self.jobs = {status: 0 for status in FINISHED_STATUSES}
+        self.job_seconds = []
+        self.started = 0
+
+    def call(self, endpoint, path, body=None):
+        """(status code, JSON body) for one API request, timing it under endpoint"""
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data,
+                                     headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.latencies[endpoint].append(elapsed)
+            if status >= 400:
+                key = f'{endpoint} {status}'
+                self.http_errors[key] = self.http_errors.get(key, 0) + 1
+        try:
+            return status, json.loads(payload or b'{}')
+        except ValueError:
+            return status, {}
+
+    def user(self, number, stop):
+        n = number
+        while not stop.is_set():
+            url = stub_extractor.video_url(self.video_ids[n % len(self.video_ids)])
+            n += 1
+            status, _ = self.call('video-info', '/api/video-info', {'url': url})
+            if status != 200:
+                continue
+            status, started = self.call('download', '/api/download', {
+                'url': url, 'format_id': self.format_id, 'download_type': 'video',
+                'download_path': os.path.join(self.download_path, f'user{number}')
+            })
+            if status != 200:
+                continue
+            with self.lock:
+                self.started += 1
+            job_start = time.perf_counter()
+            # Let running jobs finish after the deadline so their time is counted
+            while True:
+                time.sleep(self.poll_interval)
+                status, progress = self.call('progress', f"/api/progress/{started['download_id']}")
+                if status == 404:
+                    break
+                if progress.get('status') in FINISHED_STATUSES:
+                    with self.lock:
+                        self.jobs[progress['status']] += 1
+                        self.job_seconds.append(time.perf_counter() - job_start)
+                    break
+
+def main():
+    parser = argparse.ArgumentParser(description='TubeSync end-to-end load test')
+    parser.add_argument('--concurrency', type=int, default=20, help='simulated users (concurrent jobs)')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to keep starting jobs')
+    parser.add_argument('--videos', type=int, default=50, help='distinct recorded videos')
+    parser.add_argument('--media-seconds', type=int, default=20, help='duration of each recorded video')
+    parser.add_argument('--format', default='18', help='format requested by every download')
+    parser.add_argument('--throttle', type=float, default=2048, help='KB/s per media connection (0 = unlimited)')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='share of media requests answered 429/503')
+    parser.add_argument('--reset-rate', type=float, default=0.0, help='share of media responses cut mid-transfer')
+    parser.add_argument('--poll-interval', type=float, default=0.5, help='seconds between /api/progress polls')
+    parser.add_argument('--recording', help='yt-dlp -J output to use for every video instead of synthetic info')
+    parser.add_argument('--verbose', action='store_true', help='show TubeSync and yt-dlp output')
+    args = parser.parse_args()
+
+    half = args.failure_rate / 2
+    media = MediaServer(throttle_bps=args.throttle * 1024, failure_rates={429: half, 503: half},
+                        reset_rate=args.reset_rate, seed=1).start()
+    video_ids = [f'load{i:07d}' for i in range(args.videos)]
+    if args.recording:
+        template = stub_extractor.load_recording(args.recording, media)
+        recordings = [dict(template, id=video_id, title=f"{template.get('title')} {video_id}") for video_id in video_ids]
+    else:
+        recordings = [stub_extractor.synthetic_recording(video_id, media, args.media_seconds) for video_id in video_ids]
+    stub_extractor.install(recordings)
+
+    # TubeSync creates ./downloads and per-user state under ~/.tubesync (thumbnails,
+    # subscriptions, media library); keep all of it in a scratch folder
+    workdir = tempfile.mkdtemp(prefix='tubesync-load-')
+    os.chdir(workdir)
+    os.environ['HOME'] = os.environ['USERPROFILE'] = workdir
+    import app as tubesync_app
+    tubesync = tubesync_app.TubeSyncDesktop()
+    server = make_server('127.0.0.1', 0, tubesync.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    driver = LoadDriver(f'http://127.0.0.1:{server.server_port}', video_ids,
+                        os.path.join(workdir, 'out'), args.format, args.poll_interval)
+
+    print(f"{args.concurrency} users for {args.duration:.0f}s, {args.videos} videos x {args.media_seconds}s, "
+          f"format {args.format}, throttle {args.throttle:.0f}KB/s, failures {args.failure_rate:.0%}, "
+          f"resets {args.reset_rate:.0%}")
+    memory = [(0.0, rss_bytes(), 0, 0)]
+    stop = threading.Event()
+    devnull = open(os.devnull, 'w')
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)
+    if not args.verbose:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    started = time.perf_counter()
+    try:
+        with quiet:
+            users = [threading.Thread(target=driver.user, args=(i, stop), daemon=True)
+                     for i in range(args.concurrency)]
+            for thread in users:
+                thread.start()
+            while any(thread.is_alive() for thread in users):
+                time.sleep(1)
+                elapsed = time.perf_counter() - started
+                memory.append((elapsed, rss_bytes(), len(tubesync.download_progress), len(tubesync.job_traces)))
+                if elapsed >= args.duration:
+                    stop.set()
+        elapsed = time.perf_counter() - started
+
+        finished = sum(driver.jobs.values())
+        print(f"\nJobs: {driver.started} started, {finished} finished in {elapsed:.1f}s "
+              f"({finished / elapsed:.2f} jobs/s) - " + ', '.join(f'{k}={v}' for k, v in driver.jobs.items() if v))
+        print(f"Media server: {media.stats['requests']} requests, {media.stats['bytes_sent'] / 1e6:.1f}MB sent "
+              f"({media.stats['bytes_sent'] / 1e6 / elapsed:.1f}MB/s), {media.stats['range_requests']} range requests, "
+              f"injected {media.stats['injected'] or 'none'}, resets {media.stats['resets']}")
+        print(f"Job duration        {percentiles(driver.job_seconds)}")
+        for endpoint, samples in driver.latencies.items():
+            print(f"/api/{endpoint:14s} {percentiles(samples)}")
+        if driver.http_errors:
+            print(f"HTTP errors: {driver.http_errors}")
+        print(f"YoutubeDL pool: {backend.ydl_pool.stats}")
+
+        print("\nMemory over time (RSS, tracked progress entries, job traces):")
+        step = max(1, len(memory) // 10)
+        for seconds, rss, progress_entries, traces in memory[::step] + ([memory[-1]] if (len(memory) - 1) % step else []):
+            print(f"  t={seconds:6.1f}s rss={rss / 2**20:7.1f}MB progress={progress_entries:5d} traces={traces:5d}")
+        growth = memory[-1][1] - memory[0][1]
+        per_job = growth / finished if finished else 0
+        print(f"  growth {growth / 2**20:+.1f}MB ({per_job / 1024:+.1f}KB per finished job)")
+    finally:
+        server.shutdown()
+        media.shutdown()
+        backend.ydl_pool.close()
+        devnull.close()
+        os.chdir(os.path.dirname(workdir))
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+TubeSync Benchmark - local media server for load tests
+
+Serves deterministic fake media at /media/<name>?size=<bytes> with HTTP
+Range support, per-connection throttling and injectable failures
+(HTTP 429/403/503 responses and connections reset mid-transfer).
+
+Usage: python benchmarks/media_server.py [port]
+"""
+
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_SIZE = 2 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+RANGE_PATTERN = re.compile(r'bytes=(\d+)-(\d*)')
+
+# Repeating 0..250 pattern; a file's content is this shifted by a per-name seed
+PATTERN = bytes(range(251)) * (CHUNK_SIZE // 251 + 2)
+
+def media_bytes(name, start, end):
+    """Deterministic content for bytes start..end (inclusive) of a media file"""
+    seed = sum(name.encode('utf-8')) % 251
+    parts = []
+    while start <= end:
+        length = min(end - start + 1, CHUNK_SIZE)
+        offset = (seed + start) % 251
+        parts.append(PATTERN[offset:offset + length])
+        start += length
+    return b''.join(parts)
+
+class MediaServer(ThreadingHTTPServer):
+    """Threaded media server; failure rates are probabilities per request"""
+    daemon_threads = True
+
+    def __init__(self, port=0, throttle_bps=0, failure_rates=None, reset_rate=0.0, seed=None):
+        super().__init__(('127.0.0.1', port), MediaHandler)
+        self.throttle_bps = throttle_bps
+        # e.g. {429: 0.02, 503: 0.01}
+        self.failure_rates = dict(failure_rates or {})
+        self.reset_rate = reset_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'range_requests': 0, 'bytes_sent': 0, 'resets': 0, 'injected': {}}
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+    def media_url(self, name, size=DEFAULT_SIZE):
+        return f'{self.url}/media/{name}?size={size}'
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='media-server', daemon=True).start()
+        return self
+
+    def pick_failure(self):
+        """Injected HTTP status for this request, 'reset', or None"""
+        with self.lock:
+            roll = self.random.random()
+            for status, rate in self.failure_rates.items():
+                if roll < rate:
+                    self.stats['injected'][status] = self.stats['injected'].get(status, 0) + 1
+                    return status
+                roll -= rate
+            if self.random.random() < self.reset_rate:
+                self.stats['resets'] += 1
+                return 'reset'
+        return None
+
+    def count(self, key, amount=1):
+        with self.lock:
+            self.stats[key] += amount
+
+class MediaHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def _serve(self, send_body):
+        server = self.server
+        server.count('requests')
+        parsed = urlparse(self.path)
+        if not parsed.path.startswith('/media/'):
+            self.send_error(404)
+            return
+        name = parsed.path[len('/media/'):]
+        size = int(parse_qs(parsed.query).get('size', [DEFAULT_SIZE])[0])
+
+        failure = server.pick_failure() if send_body else None
+        if isinstance(failure, int):
+            self.send_response(failure)
+            self.send_header('Content-Length', '0')
+            if failure == 429:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            return
+
+        start, end = 0, size - 1
+        match = RANGE_PATTERN.match(self.headers.get('Range', ''))
+        if match:
+            server.count('range_requests')
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+            if start >= size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        self.send_response(206 if match else 200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        if match:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+        if send_body:
+            self._send_body(name, start, end, reset=failure == 'reset')
+
+    def _send_body(self, name, start, end, reset=False):
+        server = self.server
+        # A reset drops the connection somewhere in the middle of the body
+        cut_at = start + (end - start) // 2 if reset else None
+        position = start
+        try:
+            while position <= end:
+                chunk_end = min(position + CHUNK_SIZE - 1, end)
+                if cut_at is not None and chunk_end >= cut_at:
+                    self.close_connection = True
+                    self.connection.shutdown(2)
+                    return
+                chunk = media_bytes(name, position, chunk_end)
+                self.wfile.write(chunk)
+                server.count('bytes_sent', len(chunk))
+                position = chunk_end + 1
+                if server.throttle_bps:
+                    time.sleep(len(chunk) / server.throttle_bps)
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+def main():
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    server = MediaServer(port=port)
+    print(f"Serving fake media at {server.media_url('example.mp4')}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+TubeSync Benchmark - stub YouTube extractor for load tests
+
+Answers YouTube watch URLs with recorded info dicts whose format URLs point
+at a local MediaServer, so the full TubeSync request path (info cache,
+format listing, yt-dlp download, progress hooks) runs without touching
+YouTube. Recordings are either synthetic or real `yt-dlp -J` output with
+the format URLs rewritten.
+
+Usage: python benchmarks/stub_extractor.py [recording.json]
+"""
+
+import copy
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.utils import ExtractorError
+import backend
+
+# Formats in a synthetic recording: (format_id, ext, height, vcodec, acodec, tbr kbps)
+SYNTHETIC_FORMATS = [
+    ('140', 'm4a', None, 'none', 'mp4a.40.2', 128),
+    ('18', 'mp4', 360, 'avc1.42001E', 'mp4a.40.2', 500),
+    ('134', 'mp4', 360, 'avc1.4d401e', 'none', 400),
+    ('136', 'mp4', 720, 'avc1.4d401f', 'none', 1500),
+]
+
+def video_url(video_id):
+    return f'https://www.youtube.com/watch?v={video_id}'
+
+def synthetic_recording(video_id, media_server, duration=60):
+    """Info dict shaped like a YouTube extraction; sizes follow tbr x duration"""
+    formats = []
+    for format_id, ext, height, vcodec, acodec, tbr in SYNTHETIC_FORMATS:
+        filesize = tbr * 1000 // 8 * duration
+        formats.append({
+            'format_id': format_id,
+            'url': media_server.media_url(f'{video_id}-{format_id}.{ext}', filesize),
+            'ext': ext,
+            'protocol': 'https',
+            'width': height * 16 // 9 if height else None,
+            'height': height,
+            'fps': 30 if height else None,
+            'vcodec': vcodec,
+            'acodec': acodec,
+            'tbr': tbr,
+            'filesize': filesize,
+            'format_note': f'{height}p' if height else 'medium',
+        })
+    return {
+        'id': video_id,
+        'title': f'Load test video {video_id}',
+        'uploader': 'TubeSync Load Test',
+        'duration': duration,
+        'view_count': 0,
+        'upload_date': '20240101',
+        'thumbnail': media_server.media_url(f'{video_id}.jpg', 4096),
+        'webpage_url': video_url(video_id),
+        'formats': formats,
+    }
+
+def load_recording(path, media_server):
+    """A real `yt-dlp -J` info dict with every format served by media_server"""
+    with open(path, 'r', encoding='utf-8') as f:
+        info = json.load(f)
+    info.pop('requested_formats', None)
+    for fmt in info.get('formats', []):
+        # Manifest and fragment formats cannot be served as one file
+        fmt.pop('fragments', None)
+        fmt.pop('manifest_url', None)
+        fmt['protocol'] = 'https'
+        size = fmt.get('filesize') or fmt.get('filesize_approx') or 1024 * 1024
+        fmt['url'] = media_server.media_url(f"{info['id']}-{fmt.get('format_id')}.{fmt.get('ext', 'bin')}", int(size))
+    return info
+
+class StubIE(InfoExtractor):
+    """Returns recordings by video ID; unknown IDs fail like an unavailable video"""
+    IE_NAME = 'tubesync:stub'
+    _VALID_URL = r'https?://(?:www\.)?(?:youtube\.com/watch\?v=|youtu\.be/)(?P<id>[\w-]{11})'
+    recordings = {}
+
+    def _real_extract(self, url):
+        video_id = self._match_id(url)
+        recording = self.recordings.get(video_id)
+        if recording is None:
+            raise ExtractorError('Video unavailable', expected=True, video_id=video_id)
+        return copy.deepcopy(recording)
+
+def install(recordings):
+    """Make every pooled YoutubeDL try StubIE before the real extractors.
+
+    Only the in-process pool is patched, so keep TUBESYNC_EXTRACTION_PROCESSES
+    unset when using the stub.
+    """
+    StubIE.recordings = {info['id']: info for info in recordings}
+    if getattr(backend._PooledYoutubeDL, '_stub_installed', False):
+        return
+    original_init = backend._PooledYoutubeDL.__init__
+
+    def init_with_stub(self, ydl_opts):
+        original_init(self, ydl_opts)
+        ydl = self.ydl
+        stub = StubIE(ydl)
+        # extract_info uses the first suitable extractor in registration order
+        ydl._ies = {StubIE.ie_key(): StubIE, **ydl._ies}
+        ydl._ies_instances[StubIE.ie_key()] = stub
+
+    backend._PooledYoutubeDL.__init__ = init_with_stub
+    backend._PooledYoutubeDL._stub_installed = True
+
+def main():
+    from media_server import MediaServer
+
+    server = MediaServer().start()
+    if len(sys.argv) > 1:
+        recording = load_recording(sys.argv[1], server)
+    else:
+        recording = synthetic_recording('stubvideo01', server)
+    install([recording])
+    info = backend.get_video_info(video_url(recording['id']))
+    print(f"{info['title']}: {len(info['formats'])} formats via {info['extractor']}")
+    for fmt in info['formats']:
+        print(f"  {fmt['format_id']:>6} {fmt['ext']:5} {fmt['url']}")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+TubeSync Job Trace - per-job timeline spans exported as Chrome trace events
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+class JobTrace:
+    """Timestamped spans for one download job, grouped into tracks.
+
+    A track is a row in the timeline viewer: 'job' for job-level phases,
+    one per video for playlist entries. Spans are either recorded around a
+    block with span() or opened and closed from yt-dlp hooks, which is how
+    download, merge and post-processing phases are captured.
+    """
+    # Spans kept per job; later ones are counted but dropped
+    MAX_SPANS = 50000
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.created = time.time()
+        self.finished = None  # set by finish() once the job is over
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._spans = []  # (track, name, category, start, end, args)
+        self._tracks = {}  # track name -> tid, in order of first use
+        self._open = {}  # (track, key) -> (name, category, start, args)
+
+    def finish(self):
+        self.finished = time.time()
+
+    def add(self, track, name, start, end, category='job', **args):
+        with self._lock:
+            self._tracks.setdefault(track, len(self._tracks) + 1)
+            if len(self._spans) >= self.MAX_SPANS:
+                self.dropped += 1
+                return
+            self._spans.append((track, name, category, start, end, args))
+
+    @contextmanager
+    def span(self, track, name, category='job', **args):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(track, name, start, time.time(), category, **args)
+
+    def begin(self, track, key, name, category='job', start=None, **args):
+        with self._lock:
+            self._tracks.setdefault(track, len(self._tracks) + 1)
+            self._open[(track, key)] = (name, category, start or time.time(), args)
+
+    def end(self, track, key, **args):
+        with self._lock:
+            opened = self._open.pop((track, key), None)
+        if opened:
+            name, category, start, open_args = opened
+            self.add(track, name, start, time.time(), category, **dict(open_args, **args))
+
+    def end_all(self, track, **args):
+        """Close whatever is still open on track, e.g. after an interrupted attempt"""
+        with self._lock:
+            keys = [key for (open_track, key) in self._open if open_track == track]
+        for key in keys:
+            self.end(track, key, **args)
+
+    def begin_attempt(self, track):
+        """Mark the start of a yt-dlp download call; the time until its first
+        progress hook is yt-dlp's own extraction and format selection"""
+        self.begin(track, 'attempt', 'extraction', 'extraction', source='yt-dlp')
+
+    def on_progress(self, track, d):
+        """Feed a yt-dlp progress hook dict"""
+        filename = os.path.basename(d.get('filename') or '')
+        key = 'download:' + filename
+        if d.get('status') == 'downloading':
+            with self._lock:
+                started = (track, key) in self._open
+            if not started:
+                self.end(track, 'attempt')
+                self.begin(track, key, 'download', 'download', file=filename)
+        elif d.get('status') == 'finished':
+            self.end(track, 'attempt')
+            self.end(track, key, bytes=d.get('total_bytes') or d.get('downloaded_bytes'))
+
+    def on_postprocess(self, track, d):
+        """Feed a yt-dlp postprocessor hook dict"""
+        postprocessor = d.get('postprocessor') or 'unknown'
+        key = 'postprocess:' + postprocessor
+        if d.get('status') == 'started':
+            name = 'merge' if postprocessor == 'Merger' else 'post-processing'
+            self.begin(track, key, name, 'postprocess', postprocessor=postprocessor)
+        elif d.get('status') == 'finished':
+            self.end(track, key)
+
+    def to_chrome_trace(self):
+        """Trace-event JSON for chrome://tracing or Perfetto; times are microseconds from job creation"""
+        now = time.time()
+        with self._lock:
+            spans = list(self._spans)
+            spans.extend((track, name, category, start, now, dict(args, running=True))
+                         for (track, _), (name, category, start, args) in self._open.items())
+            tracks = dict(self._tracks)
+
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': 1, 'args': {'name': self.job_id}}]
+        for track, tid in tracks.items():
+            events.append({'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'name': track}})
+            events.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': 1, 'tid': tid, 'args': {'sort_index': tid}})
+        for track, name, category, start, end, args in sorted(spans, key=lambda span: span[3]):
+            events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': round((start - self.created) * 1e6),
+                'dur': round(max(end - start, 0) * 1e6),
+                'pid': 1,
+                'tid': tracks[track],
+                'args': args
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms',
+                'otherData': {'job_id': self.job_id, 'created': self.created, 'dropped_spans': self.dropped}}
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+TubeSync Media Library - SQLite index of finished downloads with full-text search
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+def default_library_path():
+    """Per-user database next to the thumbnail cache"""
+    return os.path.join(os.path.expanduser('~'), '.tubesync', 'library.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    filepath TEXT NOT NULL UNIQUE,
+    video_id TEXT,
+    title TEXT,
+    uploader TEXT,
+    duration REAL,
+    format_id TEXT,
+    download_type TEXT,
+    ext TEXT,
+    width INTEGER,
+    height INTEGER,
+    fps REAL,
+    vcodec TEXT,
+    acodec TEXT,
+    filesize INTEGER,
+    added REAL NOT NULL,
+    metadata TEXT
+);
+CREATE INDEX IF NOT EXISTS items_added ON items (added);
+CREATE INDEX IF NOT EXISTS items_uploader ON items (uploader COLLATE NOCASE, added);
+CREATE INDEX IF NOT EXISTS items_height ON items (height, added);
+CREATE INDEX IF NOT EXISTS items_duration ON items (duration);
+CREATE INDEX IF NOT EXISTS items_title ON items (title COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS items_filesize ON items (filesize);
+CREATE INDEX IF NOT EXISTS items_video_id ON items (video_id);
+"""
+
+# External-content FTS5 table over title/uploader, kept in sync by triggers
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(title, uploader, content='items', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts (rowid, title, uploader) VALUES (new.id, new.title, new.uploader);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, uploader) VALUES ('delete', old.id, old.title, old.uploader);
+END;
+CREATE TRIGGER IF NOT EXISTS items_au AFTER UPDATE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, uploader) VALUES ('delete', old.id, old.title, old.uploader);
+    INSERT INTO items_fts (rowid, title, uploader) VALUES (new.id, new.title, new.uploader);
+END;
+"""
+
+ITEM_COLUMNS = ('id', 'filepath', 'video_id', 'title', 'uploader', 'duration', 'format_id', 'download_type',
+                'ext', 'width', 'height', 'fps', 'vcodec', 'acodec', 'filesize', 'added')
+SORT_COLUMNS = {
+    'added': 'added',
+    'title': 'title COLLATE NOCASE',
+    'uploader': 'uploader COLLATE NOCASE',
+    'duration': 'duration',
+    'height': 'height',
+    'filesize': 'filesize'
+}
+# Info dict fields kept in the metadata column
+METADATA_KEYS = ('webpage_url', 'channel', 'channel_id', 'upload_date', 'view_count', 'like_count',
+                 'description', 'tags', 'categories', 'language')
+
+def selected_formats(info, format_id):
+    """Format dicts picked by format_id - the first alternative of a selector, split on '+'"""
+    formats = {fmt.get('format_id'): fmt for fmt in (info or {}).get('formats') or []}
+    wanted = (format_id or '').split('/')[0]
+    return [formats[part] for part in wanted.split('+') if part in formats]
+
+def fts_query(text):
+    """Match expression for free text: every word must match, as a prefix"""
+    words = [word.replace('"', '""') for word in text.split()]
+    return ' '.join(f'"{word}"*' for word in words if word)
+
+class MediaLibrary:
+    """Searchable index of downloaded files.
+
+    One row per file, upserted by path, with the video and format details
+    the UI filters on. Title and uploader are full-text indexed (FTS5)
+    when SQLite supports it, otherwise matched with LIKE. A single
+    connection is shared and serialized by a lock; WAL keeps inserts cheap.
+    """
+    # Largest page query() returns
+    MAX_PER_PAGE = 500
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or default_library_path()
+        folder = os.path.dirname(self.db_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        try:
+            self._db.executescript(FTS_SCHEMA)
+            self.full_text = True
+        except sqlite3.OperationalError as e:
+            print(f"Library search without FTS5: {e}")
+            self.full_text = False
+        self._db.commit()
+
+    def record(self, filepath, info=None, format_id=None, download_type=None):
+        """Add or update the entry for a finished file"""
+        info = info or {}
+        formats = selected_formats(info, format_id)
+        video = next((fmt for fmt in formats if fmt.get('vcodec') not in (None, 'none')), {})
+        audio = next((fmt for fmt in formats if fmt.get('acodec') not in (None, 'none')), {})
+        ext = os.path.splitext(filepath)[1].lstrip('.').lower()
+        acodec = audio.get('acodec')
+        if download_type in ('audio', 'raw') and ext == 'mp3':
+            # Converted by FFmpegExtractAudio
+            acodec = 'mp3'
+        try:
+            filesize = os.path.getsize(filepath)
+        except OSError:
+            filesize = None
+
+        row = {
+            'filepath': os.path.abspath(filepath),
+            'video_id': info.get('id'),
+            'title': info.get('title') or os.path.splitext(os.path.basename(filepath))[0],
+            'uploader': info.get('uploader') or info.get('channel'),
+            'duration': info.get('duration'),
+            'format_id': '+'.join(fmt['format_id'] for fmt in formats) or format_id,
+            'download_type': download_type,
+            'ext': ext,
+            'width': video.get('width') if download_type not in ('audio', 'raw') else None,
+            'height': video.get('height') if download_type not in ('audio', 'raw') else None,
+            'fps': video.get('fps') if download_type not in ('audio', 'raw') else None,
+            'vcodec': video.get('vcodec') if download_type not in ('audio', 'raw') else None,
+            'acodec': acodec,
+            'filesize': filesize,
+            'added': time.time(),
+            'metadata': json.dumps({key: info[key] for key in METADATA_KEYS if info.get(key) is not None})
+        }
+        columns = ', '.join(row)
+        placeholders = ', '.join(f':{key}' for key in row)
+        updates = ', '.join(f'{key} = excluded.{key}' for key in row if key != 'filepath')
+        with self._lock:
+            cursor = self._db.execute(
+                f'INSERT INTO items ({columns}) VALUES ({placeholders}) '
+                f'ON CONFLICT (filepath) DO UPDATE SET {updates}', row)
+            self._db.commit()
+        return cursor.lastrowid
+
+    def query(self, q=None, uploader=None, video_id=None, ext=None, vcodec=None, acodec=None,
+              min_height=None, max_height=None, min_duration=None, max_duration=None,
+              sort='added', order='desc', page=1, per_page=50):
+        """One page of matching items plus the total match count.
+
+        Raises ValueError for an unknown sort column.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort '{sort}', expected one of {', '.join(SORT_COLUMNS)}")
+        direction = 'ASC' if str(order).lower() == 'asc' else 'DESC'
+        page = max(int(page or 1), 1)
+        per_page = min(max(int(per_page or 50), 1), self.MAX_PER_PAGE)
+
+        where, params = [], []
+        if q and q.strip():
+            if self.full_text:
+                where.append('id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)')
+                params.append(fts_query(q))
+            else:
+                where.append('(title LIKE ? OR uploader LIKE ?)')
+                params.extend([f'%{q.strip()}%'] * 2)
+        for column, value in (('uploader', uploader), ('video_id', video_id), ('ext', ext)):
+            if value:
+                where.append(f'{column} = ? COLLATE NOCASE')
+                params.append(value)
+        for column, value in (('vcodec', vcodec), ('acodec', acodec)):
+            if value:
+                # 'avc1' matches 'avc1.640028'
+                where.append(f'{column} LIKE ?')
+                params.append(value + '%')
+        for column, operator, value in (('height', '>=', min_height), ('height', '<=', max_height),
+                                        ('duration', '>=', min_duration), ('duration', '<=', max_duration)):
+            if value not in (None, ''):
+                where.append(f'{column} {operator} ?')
+                params.append(float(value))
+
+        clause = f"WHERE {' AND '.join(where)}" if where else ''
+        with self._lock:
+            total = self._db.execute(f'SELECT COUNT(*) FROM items {clause}', params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT {', '.join(ITEM_COLUMNS)} FROM items {clause} "
+                f"ORDER BY {SORT_COLUMNS[sort]} {direction}, id {direction} LIMIT ? OFFSET ?",
+                params + [per_page, (page - 1) * per_page]).fetchall()
+        return {
+            'items': [dict(row) for row in rows],
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        }
+
+    def get(self, item_id):
+        """Full entry including the stored metadata, or None"""
+        with self._lock:
+            row = self._db.execute('SELECT * FROM items WHERE id = ?', (item_id,)).fetchone()
+        if row is None:
+            return None
+        item = dict(row)
+        item['metadata'] = json.loads(item['metadata'] or '{}')
+        return item
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+TubeSync Media Store - content-addressed store of finished downloads shared across folders
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Directory of the store; the store is disabled unless this is set
+MEDIA_STORE_ENV = 'TUBESYNC_MEDIA_STORE'
+MEDIA_STORE_MAX_ENV = 'TUBESYNC_MEDIA_STORE_MAX_GB'
+DEFAULT_MAX_GB = 50
+
+# Linux ioctl that makes dst share src's extents (btrfs, XFS, bcachefs)
+FICLONE = 0x40049409
+
+def media_key(video_id, format_id, settings=None):
+    """Store key for one video rendered with one format selector and post-processing settings"""
+    identity = json.dumps({'video_id': video_id, 'format_id': format_id, 'settings': settings or {}},
+                          sort_keys=True, default=repr)
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()
+
+def reflink(src, dst):
+    """Copy-on-write clone of src at dst; raises OSError where unsupported"""
+    if fcntl is None or not sys.platform.startswith('linux'):
+        raise OSError(errno.EOPNOTSUPP, 'reflink not supported on this platform')
+    with open(src, 'rb') as source, open(dst, 'wb') as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            target.close()
+            os.remove(dst)
+            raise
+
+def clone_file(src, dst):
+    """Place src's content at dst without transferring it where the filesystem allows.
+
+    Tries a reflink (independent copy sharing blocks), then a hardlink (same
+    file), then a plain copy across devices. Returns the method used.
+    """
+    try:
+        reflink(src, dst)
+        return 'reflink'
+    except OSError:
+        pass
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError:
+        pass
+    shutil.copy2(src, dst)
+    return 'copy'
+
+class MediaStore:
+    """Finished media files keyed by media_key(video ID, format, settings).
+
+    Objects live in objects/<key[:2]>/<key><ext> with a <key>.json sidecar
+    holding the original filename, size and last use. The last-use time is
+    kept in the sidecar rather than the file mtime because hardlinked copies
+    share the object's inode. When the store grows past max_bytes the
+    least recently used objects are removed; copies already delivered to
+    download folders are not touched.
+    """
+    def __init__(self, store_dir, max_bytes=DEFAULT_MAX_GB * 1024 ** 3):
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, 'objects')
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> (object path, size), least recently used first
+        self._total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0, 'bytes_saved': 0}
+
+        if not os.path.exists(self.objects_dir):
+            os.makedirs(self.objects_dir)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for folder in os.listdir(self.objects_dir):
+            folder_path = os.path.join(self.objects_dir, folder)
+            if not os.path.isdir(folder_path):
+                continue
+            for filename in os.listdir(folder_path):
+                if not filename.endswith('.json'):
+                    continue
+                meta = self._read_meta(os.path.join(folder_path, filename))
+                object_path = os.path.join(folder_path, meta.get('object', '')) if meta else None
+                if not object_path or not os.path.isfile(object_path):
+                    continue
+                entries.append((meta.get('last_used', 0), filename[:-5], object_path, os.path.getsize(object_path)))
+        for _, key, object_path, size in sorted(entries):
+            self._index[key] = (object_path, size)
+            self._total_bytes += size
+
+    def _meta_path(self, key):
+        return os.path.join(self.objects_dir, key[:2], key + '.json')
+
+    def deliver(self, key, dest_dir):
+        """Put the stored media for key into dest_dir.
+
+        Returns (path, method) - method is reflink, hardlink, copy or
+        existing - or None when the key is not in the store.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._index.move_to_end(key)
+        object_path, size = entry
+        meta_path = self._meta_path(key)
+        meta = self._read_meta(meta_path) or {}
+        dest_path = os.path.join(dest_dir, meta.get('filename') or os.path.basename(object_path))
+
+        try:
+            if os.path.exists(dest_path) and os.path.getsize(dest_path) == size:
+                method = 'existing'
+            else:
+                if not os.path.exists(dest_dir):
+                    os.makedirs(dest_dir)
+                tmp_path = f'{dest_path}.{threading.get_ident()}.part'
+                method = clone_file(object_path, tmp_path)
+                os.replace(tmp_path, dest_path)
+        except OSError as e:
+            print(f"Error delivering {key[:12]} from media store: {e}")
+            return None
+
+        meta['last_used'] = time.time()
+        self._write_meta(meta_path, meta)
+        with self._lock:
+            self.stats['hits'] += 1
+            self.stats['bytes_saved'] += size
+        return dest_path, method
+
+    def add(self, key, source_path, **meta):
+        """Store a finished file under key; the source stays where it is"""
+        try:
+            size = os.path.getsize(source_path)
+            if size > self.max_bytes:
+                return False
+            folder = os.path.join(self.objects_dir, key[:2])
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            object_name = key + os.path.splitext(source_path)[1]
+            object_path = os.path.join(folder, object_name)
+            tmp_path = f'{object_path}.{threading.get_ident()}.part'
+            method = clone_file(source_path, tmp_path)
+            os.replace(tmp_path, object_path)
+            meta.update({'object': object_name, 'filename': os.path.basename(source_path), 'size': size,
+                         'stored_at': time.time(), 'last_used': time.time(), 'method': method})
+            self._write_meta(self._meta_path(key), meta)
+        except OSError as e:
+            print(f"Error adding {source_path} to media store: {e}")
+            return False
+
+        with self._lock:
+            previous = self._index.pop(key, None)
+            self._total_bytes += size - (previous[1] if previous else 0)
+            self._index[key] = (object_path, size)
+            self.stats['stored'] += 1
+        self._evict()
+        return True
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or not self._index:
+                    return
+                key, (object_path, size) = self._index.popitem(last=False)
+                self._total_bytes -= size
+                self.stats['evicted'] += 1
+            for path in (object_path, self._meta_path(key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @property
+    def total_bytes(self):
+        return self._total_bytes
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        tmp_path = f'{meta_path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+def media_store_from_env():
+    """The configured MediaStore, or None when TUBESYNC_MEDIA_STORE is not set"""
+    store_dir = os.environ.get(MEDIA_STORE_ENV)
+    if not store_dir:
+        return None
+    try:
+        max_gb = float(os.environ.get(MEDIA_STORE_MAX_ENV) or DEFAULT_MAX_GB)
+        return MediaStore(os.path.expanduser(store_dir), int(max_gb * 1024 ** 3))
+    except (OSError, ValueError) as e:
+        print(f"Media store disabled: {e}")
+        return None
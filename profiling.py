@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+TubeSync Profiling - opt-in cProfile capture for API requests and download jobs
+"""
+
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import abort, g, jsonify, request, send_from_directory
+
+# '' (off), 'header' (requests sending PROFILE_HEADER and the jobs they start) or 'all'
+PROFILE_ENV = 'TUBESYNC_PROFILE'
+PROFILE_DIR_ENV = 'TUBESYNC_PROFILE_DIR'
+PROFILE_HEADER = 'X-TubeSync-Profile'
+PROFILE_NAME_PATTERN = re.compile(r'^[\w.-]+\.(prof|txt)$')
+
+def default_profile_dir():
+    """Per-user folder next to the thumbnail cache"""
+    return os.path.join(os.path.expanduser('~'), '.tubesync', 'profiles')
+
+class Profiler:
+    """Writes a .prof (pstats) file and a .txt summary per profiled request or job.
+
+    Nothing is hooked into Flask unless profiling is enabled, so a normal
+    run pays nothing for it. cProfile is deterministic and only sees the
+    thread it was enabled in, which is the request or job worker thread.
+    """
+    # Functions listed in the .txt summary
+    SUMMARY_LINES = 40
+
+    def __init__(self, mode=None, output_dir=None):
+        self.mode = (mode if mode is not None else os.environ.get(PROFILE_ENV, '')).strip().lower()
+        if self.mode in ('1', 'true', 'yes'):
+            self.mode = 'header'
+        self.output_dir = output_dir or os.environ.get(PROFILE_DIR_ENV) or default_profile_dir()
+        self._counter = itertools.count(1)
+
+    @property
+    def enabled(self):
+        return self.mode in ('header', 'all')
+
+    def wants(self, headers=None):
+        """Should the current request (and the jobs it starts) be profiled?"""
+        if self.mode == 'all':
+            return True
+        return self.mode == 'header' and headers is not None and bool(headers.get(PROFILE_HEADER))
+
+    def init_app(self, app):
+        """Register the request hooks and debug routes when profiling is enabled"""
+        if not self.enabled:
+            return
+        print(f"Profiling enabled ({self.mode}), writing to {self.output_dir}")
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/api/debug/profiles', 'list_profiles', self._list_profiles_route)
+        app.add_url_rule('/api/debug/profiles/<name>', 'get_profile', self._get_profile_route)
+
+    def _start_request(self):
+        if request.path.startswith('/api/debug/profiles') or not self.wants(request.headers):
+            return
+        profile = self._enable()
+        if profile is not None:
+            g.tubesync_profile = profile
+
+    def _finish_request(self, response):
+        profile = g.pop('tubesync_profile', None)
+        if profile is not None:
+            profile.disable()
+            name = self._write(f"{request.method}_{request.path}", profile)
+            if name:
+                response.headers['X-TubeSync-Profile-File'] = name
+        return response
+
+    @staticmethod
+    def _enable():
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler is already active (one per process on Python 3.12+)
+            print(f"Profiling skipped: {e}")
+            return None
+        return profile
+
+    @contextmanager
+    def profile(self, label):
+        """Profile the body of the with-block in the current thread"""
+        profile = self._enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._write(label, profile)
+
+    def wrap_job(self, label, target):
+        """Return target wrapped so the job thread running it is profiled"""
+        def run(*args, **kwargs):
+            with self.profile(label):
+                return target(*args, **kwargs)
+        return run
+
+    def _write(self, label, profile):
+        try:
+            if not os.path.exists(self.output_dir):
+                os.makedirs(self.output_dir)
+            safe_label = re.sub(r'[^\w.-]+', '_', label).strip('_')[:80]
+            base = f"{time.strftime('%Y%m%d-%H%M%S')}_{next(self._counter)}_{safe_label}"
+            profile.dump_stats(os.path.join(self.output_dir, base + '.prof'))
+
+            summary = io.StringIO()
+            stats = pstats.Stats(profile, stream=summary)
+            stats.sort_stats('cumulative').print_stats(self.SUMMARY_LINES)
+            with open(os.path.join(self.output_dir, base + '.txt'), 'w', encoding='utf-8') as f:
+                f.write(f"{label} (thread {threading.current_thread().name})\n")
+                f.write(summary.getvalue())
+            print(f"Profile written: {base}.prof")
+            return base + '.prof'
+        except Exception as e:
+            print(f"Error writing profile for {label}: {e}")
+            return None
+
+    def list_profiles(self):
+        """Profiles on disk, newest first"""
+        if not os.path.isdir(self.output_dir):
+            return []
+        profiles = []
+        for filename in os.listdir(self.output_dir):
+            if not PROFILE_NAME_PATTERN.match(filename):
+                continue
+            file_stat = os.stat(os.path.join(self.output_dir, filename))
+            profiles.append({'name': filename, 'size': file_stat.st_size, 'modified': file_stat.st_mtime})
+        profiles.sort(key=lambda x: x['modified'], reverse=True)
+        return profiles
+
+    def _list_profiles_route(self):
+        return jsonify({'mode': self.mode, 'directory': self.output_dir, 'profiles': self.list_profiles()})
+
+    def _get_profile_route(self, name):
+        if not PROFILE_NAME_PATTERN.match(name):
+            abort(404)
+        return send_from_directory(self.output_dir, name, as_attachment=name.endswith('.prof'))
@@ -1,4 +1,239 @@
 // Main application JavaScript
+
+// Windowed list rendering: only rows near the viewport exist in the DOM, so
+// lists with thousands of entries stay cheap to scroll and update. Rows keep
+// their natural height: each rendered row is measured (and re-measured by a
+// ResizeObserver when its content changes, e.g. inline download progress),
+// rows not rendered yet use an estimate, and row offsets are prefix sums.
+class VirtualList {
+    constructor(container, options) {
+        this.container = container;
+        this.renderRow = options.renderRow;
+        this.keyOf = options.keyOf || ((item, index) => index);
+        this.autoHeight = !options.rowHeight;
+        this.rowHeight = options.rowHeight || 0; // Estimate for rows not measured yet
+        this.fallbackRowHeight = options.fallbackRowHeight || 100;
+        this.gap = options.gap || 0;
+        this.overscan = options.overscan || 6;
+        this.emptyHtml = options.emptyHtml || '';
+        this.items = [];
+        this.heights = []; // index -> measured height including gap, or undefined
+        this.offsets = null; // prefix sums of row heights, rebuilt when a height changes
+        this.rows = new Map(); // index -> { key, element }
+        this.frame = null;
+
+        this.container.classList.add('virtual-list');
+        this.container.innerHTML = '';
+        this.spacer = document.createElement('div');
+        this.spacer.className = 'virtual-list-spacer';
+        this.container.appendChild(this.spacer);
+
+        // Rows that grow or shrink after rendering (progress bars, wrapped titles)
+        this.resizeObserver = typeof ResizeObserver === 'undefined' ? null
+            : new ResizeObserver(entries => {
+                if (entries.some(entry => this.measureRow(entry.target))) {
+                    this.scheduleRender();
+                }
+            });
+
+        this.container.addEventListener('scroll', () => this.scheduleRender(), { passive: true });
+        window.addEventListener('resize', () => this.scheduleRender());
+    }
+
+    setItems(items) {
+        const previous = this.heights;
+        this.items = items || [];
+        this.heights = new Array(this.items.length);
+        this.offsets = null;
+        if (this.autoHeight) {
+            this.rowHeight = 0; // Re-measure against the new data
+        }
+
+        // Keep rows whose item is unchanged (with their measured height), drop the rest
+        this.rows.forEach((row, index) => {
+            const item = this.items[index];
+            if (item === undefined || this.keyOf(item, index) !== row.key) {
+                this.removeRow(index, row);
+            } else {
+                this.heights[index] = previous[index];
+            }
+        });
+
+        this.render();
+    }
+
+    updateItem(index) {
+        const row = this.rows.get(index);
+        if (row) {
+            this.unobserve(row.element);
+            row.element.replaceWith(this.createRow(index));
+            this.scheduleRender();
+        }
+    }
+
+    // Re-measure rendered rows after their content changed outside updateItem
+    remeasure() {
+        let changed = false;
+        this.rows.forEach(row => {
+            changed = this.measureRow(row.element) || changed;
+        });
+        if (changed) {
+            this.scheduleRender();
+        }
+    }
+
+    scheduleRender() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => this.render());
+        }
+    }
+
+    render() {
+        if (this.frame !== null) {
+            cancelAnimationFrame(this.frame);
+            this.frame = null;
+        }
+
+        const count = this.items.length;
+        if (count === 0) {
+            this.spacer.style.height = 'auto';
+            this.spacer.innerHTML = this.emptyHtml;
+            return;
+        }
+        this.spacer.innerHTML = '';
+
+        if (!this.rowHeight) {
+            this.measureRowHeight();
+        }
+        const offsets = this.rowOffsets();
+        this.spacer.style.height = `${offsets[count] - this.gap}px`;
+
+        const viewTop = this.container.scrollTop;
+        const viewHeight = this.container.clientHeight || window.innerHeight;
+        const first = Math.max(0, this.indexAt(viewTop) - this.overscan);
+        const last = Math.min(count - 1, this.indexAt(viewTop + viewHeight) + this.overscan);
+
+        this.rows.forEach((row, index) => {
+            if (index < first || index > last) {
+                this.removeRow(index, row);
+            } else {
+                this.positionRow(row.element, index);
+            }
+        });
+
+        const fragment = document.createDocumentFragment();
+        const created = [];
+        for (let index = first; index <= last; index++) {
+            if (!this.rows.has(index)) {
+                const element = this.createRow(index);
+                created.push(element);
+                fragment.appendChild(element);
+            }
+        }
+        this.container.appendChild(fragment);
+
+        // New rows replace their estimate with a real height; reposition if any differed
+        let changed = false;
+        created.forEach(element => {
+            changed = this.measureRow(element) || changed;
+        });
+        if (changed) {
+            const updated = this.rowOffsets();
+            this.spacer.style.height = `${updated[count] - this.gap}px`;
+            this.rows.forEach((row, index) => this.positionRow(row.element, index));
+        }
+    }
+
+    createRow(index) {
+        const item = this.items[index];
+        const element = this.renderRow(item, index);
+        element.classList.add('virtual-row');
+        element.virtualIndex = index;
+        this.positionRow(element, index);
+        this.rows.set(index, { key: this.keyOf(item, index), element });
+        if (this.resizeObserver) {
+            this.resizeObserver.observe(element);
+        }
+        return element;
+    }
+
+    removeRow(index, row) {
+        this.unobserve(row.element);
+        row.element.remove();
+        this.rows.delete(index);
+    }
+
+    unobserve(element) {
+        if (this.resizeObserver) {
+            this.resizeObserver.unobserve(element);
+        }
+    }
+
+    positionRow(element, index) {
+        element.style.top = `${this.rowOffsets()[index]}px`;
+    }
+
+    // Store a rendered row's height; true when it changed
+    measureRow(element) {
+        const index = element.virtualIndex;
+        if (index === undefined || !element.isConnected || this.rows.get(index)?.element !== element) {
+            return false;
+        }
+        const height = Math.ceil(element.offsetHeight);
+        if (height === 0) {
+            return false; // Hidden container - keep the estimate
+        }
+        if (this.heights[index] === height + this.gap) {
+            return false;
+        }
+        this.heights[index] = height + this.gap;
+        this.offsets = null;
+        return true;
+    }
+
+    rowOffsets() {
+        if (!this.offsets || this.offsets.length !== this.items.length + 1) {
+            const offsets = new Float64Array(this.items.length + 1);
+            for (let index = 0; index < this.items.length; index++) {
+                offsets[index + 1] = offsets[index] + (this.heights[index] || this.rowHeight);
+            }
+            this.offsets = offsets;
+        }
+        return this.offsets;
+    }
+
+    // Index of the row covering vertical position y
+    indexAt(y) {
+        const offsets = this.rowOffsets();
+        let low = 0;
+        let high = this.items.length - 1;
+        while (low < high) {
+            const middle = (low + high + 1) >> 1;
+            if (offsets[middle] <= y) {
+                low = middle;
+            } else {
+                high = middle - 1;
+            }
+        }
+        return low;
+    }
+
+    measureRowHeight() {
+        const probe = this.renderRow(this.items[0], 0);
+        probe.classList.add('virtual-row');
+        probe.style.visibility = 'hidden';
+        this.container.appendChild(probe);
+        const height = Math.ceil(probe.offsetHeight);
+        probe.remove();
+        // Hidden containers measure as 0 - fall back and re-measure next time
+        this.rowHeight = height > 0 ? height + this.gap : this.fallbackRowHeight;
+        this.offsets = null;
+        if (height === 0) {
+            this.autoHeight = true;
+        }
+    }
+}
+
 class TubeSyncApp {
     constructor() {
         this.currentVideoInfo = null;
@@ -7,12 +242,41 @@ class TubeSyncApp {
         this.currentDownloadId = null;
         this.progressInterval = null;
         this.currentDownloadPath = 'downloads/'; // Default download path
+        this.prefetchTimer = null;
+        this.lastPrefetchedUrl = null;
+        this.selectedEntries = new Set(); // Selected playlist entry indexes
+        this.formatProgress = new Map(); // format_id -> last progress shown inline
         
+        this.initializeVirtualLists();
         this.initializeEventListeners();
         this.loadDownloads();
         this.initializeDownloadPath();
     }
 
+    initializeVirtualLists() {
+        this.playlistList = new VirtualList(document.getElementById('playlist-video-list'), {
+            rowHeight: 130,
+            gap: 10,
+            keyOf: (video, index) => `${index}:${video.id || video.url}`,
+            renderRow: (video, index) => this.createPlaylistVideoItem(video, index)
+        });
+
+        this.formatsList = new VirtualList(document.getElementById('formats-list'), {
+            gap: 15,
+            fallbackRowHeight: 220,
+            keyOf: format => format.format_id,
+            renderRow: format => this.createFormatItem(format)
+        });
+
+        this.downloadsList = new VirtualList(document.getElementById('downloads-list'), {
+            rowHeight: 86,
+            gap: 10,
+            emptyHtml: '<p>Downloads will appear here after completion</p>',
+            keyOf: file => `${file.name}:${file.size}:${file.modified}`,
+            renderRow: file => this.createDownloadItem(file)
+        });
+    }
+
     initializeEventListeners() {
         // Analyze button
         document.getElementById('analyze-btn').addEventListener('click', () => {
@@ -26,6 +290,14 @@ class TubeSyncApp {
             }
         });
 
+        // Warm the server-side info cache as soon as a valid URL is typed or pasted
+        const urlInput = document.getElementById('url-input');
+        ['input', 'paste'].forEach(eventName => {
+            urlInput.addEventListener(eventName, () => {
+                this.schedulePrefetch();
+            });
+        });
+
         // Download path buttons
         document.getElementById('browse-path-btn').addEventListener('click', () => {
             this.browseDownloadPath();
@@ -108,6 +380,36 @@ class TubeSyncApp {
         currentPathSpan.textContent = this.currentDownloadPath;
     }
 
+    schedulePrefetch() {
+        clearTimeout(this.prefetchTimer);
+        this.prefetchTimer = setTimeout(() => {
+            this.prefetchVideoInfo();
+        }, 400);
+    }
+
+    async prefetchVideoInfo() {
+        const url = document.getElementById('url-input').value.trim();
+        // Playlists would be resolved entry by entry in the background; only hint single videos
+        if (!url || url === this.lastPrefetchedUrl || !this.isSingleVideoUrl(url)) {
+            return;
+        }
+
+        this.lastPrefetchedUrl = url;
+        try {
+            // Fire-and-forget hint; the real request joins the running extraction
+            await fetch('/api/video-info/prefetch', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ url }),
+                priority: 'low'
+            });
+        } catch (error) {
+            console.debug('Prefetch hint failed:', error);
+        }
+    }
+
     async analyzeVideo() {
         const urlInput = document.getElementById('url-input');
         const url = urlInput.value.trim();
@@ -122,6 +424,7 @@ class TubeSyncApp {
             return;
         }
 
+        clearTimeout(this.prefetchTimer);
         this.showLoading('Analyzing video...');
         
         try {
@@ -162,8 +465,9 @@ class TubeSyncApp {
             document.getElementById('video-duration').textContent = this.formatDuration(videoInfo.duration);
             document.getElementById('video-views').textContent = this.formatNumber(videoInfo.view_count);
             
-            if (videoInfo.thumbnail) {
-                document.getElementById('video-thumbnail').src = videoInfo.thumbnail;
+            const thumbnail = videoInfo.id ? this.thumbnailUrl(videoInfo.id, 'hqdefault') : videoInfo.thumbnail;
+            if (thumbnail) {
+                document.getElementById('video-thumbnail').src = thumbnail;
             }
 
             // Show video info section
@@ -183,8 +487,11 @@ class TubeSyncApp {
         document.getElementById('playlist-uploader').textContent = playlistInfo.uploader;
         document.getElementById('playlist-count').textContent = `${playlistInfo.playlist_count} videos`;
         
-        if (playlistInfo.thumbnail) {
-            document.getElementById('playlist-thumbnail').src = playlistInfo.thumbnail;
+        // Use the first video's cached thumbnail for the playlist card
+        const firstEntry = (playlistInfo.playlist_entries || [])[0];
+        const thumbnail = firstEntry && firstEntry.id ? this.thumbnailUrl(firstEntry.id, 'hqdefault') : playlistInfo.thumbnail;
+        if (thumbnail) {
+            document.getElementById('playlist-thumbnail').src = thumbnail;
         }
 
         // Display playlist videos
@@ -197,13 +504,9 @@ class TubeSyncApp {
     }
 
     renderPlaylistVideos(videos) {
-        const playlistVideoList = document.getElementById('playlist-video-list');
-        playlistVideoList.innerHTML = '';
-
-        videos.forEach((video, index) => {
-            const videoItem = this.createPlaylistVideoItem(video, index);
-            playlistVideoList.appendChild(videoItem);
-        });
+        this.selectedEntries.clear();
+        this.playlistList.container.scrollTop = 0;
+        this.playlistList.setItems(videos || []);
     }
 
     createPlaylistVideoItem(video, index) {
@@ -212,36 +515,54 @@ class TubeSyncApp {
         div.dataset.videoIndex = index;
         div.dataset.videoUrl = video.webpage_url || video.url;
 
+        const thumbnail = video.id
+            ? `<img class="playlist-video-thumb" loading="lazy" src="${this.thumbnailUrl(video.id)}" alt="">`
+            : '';
+
         div.innerHTML = `
             <div class="playlist-video-header">
                 <input type="checkbox" class="playlist-video-checkbox" data-video-index="${index}">
+                ${thumbnail}
                 <h5>${video.title}</h5>
             </div>
             <div class="playlist-video-meta">
-                <span>${video.uploader}</span>
+                <span>${video.uploader || 'Unknown'}</span>
                 <span class="playlist-video-duration">${this.formatDuration(video.duration)}</span>
             </div>
         `;
 
+        // Selection lives in this.selectedEntries so it survives rows being recycled
+        const checkbox = div.querySelector('.playlist-video-checkbox');
+        const setSelected = (selected) => {
+            checkbox.checked = selected;
+            div.classList.toggle('selected', selected);
+            if (selected) {
+                this.selectedEntries.add(index);
+            } else {
+                this.selectedEntries.delete(index);
+            }
+        };
+        checkbox.checked = this.selectedEntries.has(index);
+        div.classList.toggle('selected', checkbox.checked);
+
         // Add click handler for selection
         div.addEventListener('click', (e) => {
             if (e.target.type !== 'checkbox') {
-                const checkbox = div.querySelector('.playlist-video-checkbox');
-                checkbox.checked = !checkbox.checked;
-                div.classList.toggle('selected', checkbox.checked);
+                setSelected(!checkbox.checked);
             }
         });
 
         // Add checkbox change handler
-        const checkbox = div.querySelector('.playlist-video-checkbox');
         checkbox.addEventListener('change', (e) => {
-            div.classList.toggle('selected', e.target.checked);
+            setSelected(e.target.checked);
         });
 
         return div;
     }
 
     displayFormats(formats) {
+        // The server sends a compact schema - derive display labels here
+        formats = (formats || []).map(format => this.expandFormat(format));
         this.currentFormats = formats;
         
         // Populate quality filter
@@ -260,14 +581,44 @@ class TubeSyncApp {
         this.renderFormatsList(formats);
     }
 
-    renderFormatsList(formats) {
-        const formatsList = document.getElementById('formats-list');
-        formatsList.innerHTML = '';
+    expandFormat(format) {
+        const isAudioOnly = format.download_type === 'audio_only';
+        const expanded = {
+            ...format,
+            vcodec: format.vcodec || (isAudioOnly ? 'none' : 'Unknown'),
+            acodec: format.acodec || 'none',
+            fps: format.fps || 0,
+            abr: format.abr || 0,
+            filesize: format.filesize || 0,
+            is_enhanced: format.download_type === 'enhanced_format',
+            has_audio: format.download_type !== 'video_only'
+        };
 
-        formats.forEach(format => {
-            const formatItem = this.createFormatItem(format);
-            formatsList.appendChild(formatItem);
-        });
+        if (isAudioOnly) {
+            expanded.resolution = 'Audio Only';
+            expanded.quality = expanded.abr ? `${Math.round(expanded.abr)}kbps` : 'Audio Only';
+        } else {
+            let resolution = format.height ? `${format.height}p` : 'Unknown';
+            if (format.height && expanded.fps) {
+                resolution += ` (${Math.round(expanded.fps)}fps)`;
+            }
+            expanded.resolution = resolution;
+            expanded.quality = resolution;
+        }
+
+        if (!expanded.has_audio) {
+            expanded.audio_info = 'No Audio';
+        } else if (expanded.acodec !== 'none') {
+            expanded.audio_info = expanded.abr ? `${expanded.abr}kbps (${expanded.acodec})` : expanded.acodec;
+        } else {
+            expanded.audio_info = 'N/A';
+        }
+
+        return expanded;
+    }
+
+    renderFormatsList(formats) {
+        this.formatsList.setItems(formats);
     }
 
     createFormatItem(format) {
@@ -324,6 +675,10 @@ class TubeSyncApp {
                         <div class="inline-progress-fill" style="width: 0%;"></div>
                     </div>
                     <div class="inline-progress-text">Starting download...</div>
+                    <div class="inline-progress-actions">
+                        <button class="job-btn pause-btn" title="Pause"><i class="fas fa-pause"></i></button>
+                        <button class="job-btn cancel-btn" title="Cancel"><i class="fas fa-times"></i></button>
+                    </div>
                 </div>
                 <button class="download-btn" data-format-id="${format.format_id}">
                     <i class="fas fa-music"></i> Download Audio
@@ -367,6 +722,10 @@ class TubeSyncApp {
                         <div class="inline-progress-fill" style="width: 0%;"></div>
                     </div>
                     <div class="inline-progress-text">Starting download...</div>
+                    <div class="inline-progress-actions">
+                        <button class="job-btn pause-btn" title="Pause"><i class="fas fa-pause"></i></button>
+                        <button class="job-btn cancel-btn" title="Cancel"><i class="fas fa-times"></i></button>
+                    </div>
                 </div>
                 <button class="download-btn" data-format-id="${format.format_id}">
                     <i class="fas fa-download"></i> Download ${hasAudio ? 'Video' : 'Video Only'}
@@ -386,6 +745,28 @@ class TubeSyncApp {
             });
         }
 
+        // Pause/resume and cancel act on the download running for this row
+        const pauseBtn = div.querySelector('.pause-btn');
+        if (pauseBtn) {
+            pauseBtn.addEventListener('click', (e) => {
+                e.preventDefault();
+                this.togglePauseDownload();
+            });
+        }
+        const cancelBtn = div.querySelector('.cancel-btn');
+        if (cancelBtn) {
+            cancelBtn.addEventListener('click', (e) => {
+                e.preventDefault();
+                this.cancelDownload();
+            });
+        }
+
+        // Restore inline progress when a downloading row is scrolled back into view
+        const progress = this.formatProgress.get(format.format_id);
+        if (progress) {
+            this.applyInlineProgress(div, progress);
+        }
+
         return div;
     }
 
@@ -451,6 +832,7 @@ class TubeSyncApp {
 
         // Store the current format ID for progress tracking
         this.currentFormatId = formatId;
+        this.formatProgress.set(formatId, { status: 'starting', progress: 0, message: 'Starting download...' });
 
         // Show inline progress for this format
         const formatItem = document.querySelector(`[data-format-id="${formatId}"]`);
@@ -496,7 +878,8 @@ class TubeSyncApp {
                     url: document.getElementById('url-input').value.trim(),
                     format_id: formatId,
                     download_type: downloadType,
-                    download_path: this.currentDownloadPath // Pass the current download path
+                    download_path: this.currentDownloadPath, // Pass the current download path
+                    ...this.getClipRange()
                 })
             });
 
@@ -509,6 +892,7 @@ class TubeSyncApp {
             } else {
                 this.showToast(data.error || 'Failed to start download', 'error');
                 // Hide progress and show download button again on error
+                this.formatProgress.delete(this.currentFormatId);
                 if (formatItem) {
                     const progressBar = formatItem.querySelector('.format-progress');
                     const downloadBtn = formatItem.querySelector('.download-btn');
@@ -521,6 +905,7 @@ class TubeSyncApp {
         } catch (error) {
             this.showToast('Network error: ' + error.message, 'error');
             // Hide progress and show download button again on error
+            this.formatProgress.delete(this.currentFormatId);
             if (formatItem) {
                 const progressBar = formatItem.querySelector('.format-progress');
                 const downloadBtn = formatItem.querySelector('.download-btn');
@@ -555,6 +940,7 @@ class TubeSyncApp {
 
         // Store the current format ID for progress tracking
         this.currentFormatId = format.format_id;
+        this.formatProgress.set(format.format_id, { status: 'starting', progress: 0, message: 'Starting download...' });
 
         // Show inline progress for this format
         const formatItem = document.querySelector(`[data-format-id="${format.format_id}"]`);
@@ -601,10 +987,11 @@ class TubeSyncApp {
             if (response.ok) {
                 this.currentDownloadId = data.download_id;
                 this.startProgressTracking();
-                this.showToast(`Playlist download started! (${data.total_videos} videos)`, 'success');
+                this.showToast(`Playlist download started! (${data.total_videos ? `${data.total_videos} videos` : 'listing videos'})`, 'success');
             } else {
                 this.showToast(data.error || 'Failed to start playlist download', 'error');
                 // Hide progress and show download button again on error
+                this.formatProgress.delete(this.currentFormatId);
                 if (formatItem) {
                     const progressBar = formatItem.querySelector('.format-progress');
                     const downloadBtn = formatItem.querySelector('.download-btn');
@@ -617,6 +1004,7 @@ class TubeSyncApp {
         } catch (error) {
             this.showToast('Network error: ' + error.message, 'error');
             // Hide progress and show download button again on error
+            this.formatProgress.delete(this.currentFormatId);
             if (formatItem) {
                 const progressBar = formatItem.querySelector('.format-progress');
                 const downloadBtn = formatItem.querySelector('.download-btn');
@@ -636,9 +1024,9 @@ class TubeSyncApp {
             return;
         }
 
-        // Get selected videos
-        const selectedCheckboxes = document.querySelectorAll('.playlist-video-checkbox:checked');
-        if (selectedCheckboxes.length === 0) {
+        // Get selected videos (tracked in data, not the DOM, since rows are virtualized)
+        const selectedIndexes = [...this.selectedEntries].sort((a, b) => a - b);
+        if (selectedIndexes.length === 0) {
             this.showToast('Please select videos to download', 'error');
             return;
         }
@@ -656,52 +1044,51 @@ class TubeSyncApp {
             downloadType = 'audio';
         }
 
-        this.showLoading(`Starting download of ${selectedCheckboxes.length} selected videos...`);
-        
-        // Download each selected video individually
-        let completed = 0;
-        let failed = 0;
+        const entries = selectedIndexes.map(index => {
+            const video = this.currentVideoInfo.playlist_entries[index];
+            return {
+                id: video.id,
+                title: video.title,
+                url: video.webpage_url || video.url
+            };
+        });
 
-        for (const checkbox of selectedCheckboxes) {
-            const videoIndex = parseInt(checkbox.dataset.videoIndex);
-            const video = this.currentVideoInfo.playlist_entries[videoIndex];
-            const videoUrl = video.webpage_url || video.url;
+        // Track group progress on the chosen format's row
+        this.currentFormatId = format.format_id;
+        this.formatProgress.set(format.format_id, { status: 'starting', progress: 0, message: 'Starting download...' });
 
-            try {
-                const response = await fetch('/api/download', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json',
-                    },
-                    body: JSON.stringify({
-                        url: videoUrl,
-                        format_id: format.format_id,
-                        download_type: downloadType,
-                        download_path: this.currentDownloadPath
-                    })
-                });
-
-                const data = await response.json();
+        this.showLoading(`Starting download of ${entries.length} selected videos...`);
+        
+        try {
+            // One request creates a single grouped job on the server
+            const response = await fetch('/api/download-bulk', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({
+                    entries,
+                    format_id: format.format_id,
+                    download_type: downloadType,
+                    download_path: this.currentDownloadPath
+                })
+            });
 
-                if (response.ok) {
-                    completed++;
-                    this.showToast(`Downloaded: ${video.title.substring(0, 50)}...`, 'success');
-                } else {
-                    failed++;
-                    this.showToast(`Failed: ${video.title.substring(0, 50)}...`, 'error');
-                }
-            } catch (error) {
-                failed++;
-                this.showToast(`Error downloading: ${video.title.substring(0, 50)}...`, 'error');
-            }
-        }
+            const data = await response.json();
 
-        this.hideLoading();
-        
-        if (failed === 0) {
-            this.showToast(`Successfully downloaded ${completed} videos!`, 'success');
-        } else {
-            this.showToast(`Downloaded ${completed} videos, ${failed} failed.`, 'warning');
+            if (response.ok) {
+                this.currentDownloadId = data.download_id;
+                this.startProgressTracking();
+                this.showToast(`Download of ${data.total_videos} selected videos started!`, 'success');
+            } else {
+                this.formatProgress.delete(format.format_id);
+                this.showToast(data.error || 'Failed to start download', 'error');
+            }
+        } catch (error) {
+            this.formatProgress.delete(format.format_id);
+            this.showToast('Network error: ' + error.message, 'error');
+        } finally {
+            this.hideLoading();
         }
     }
 
@@ -731,6 +1118,7 @@ class TubeSyncApp {
 
         // Store the current format ID for progress tracking
         this.currentFormatId = bestFormat.format_id;
+        this.formatProgress.set(bestFormat.format_id, { status: 'starting', progress: 0, message: 'Starting download...' });
 
         // Show inline progress for this format
         const formatItem = document.querySelector(`[data-format-id="${bestFormat.format_id}"]`);
@@ -777,10 +1165,11 @@ class TubeSyncApp {
             if (response.ok) {
                 this.currentDownloadId = data.download_id;
                 this.startProgressTracking();
-                this.showToast(`Full playlist download started! (${data.total_videos} videos)`, 'success');
+                this.showToast(`Full playlist download started! (${data.total_videos ? `${data.total_videos} videos` : 'listing videos'})`, 'success');
             } else {
                 this.showToast(data.error || 'Failed to start full playlist download', 'error');
                 // Hide progress and show download button again on error
+                this.formatProgress.delete(this.currentFormatId);
                 if (formatItem) {
                     const progressBar = formatItem.querySelector('.format-progress');
                     const downloadBtn = formatItem.querySelector('.download-btn');
@@ -793,6 +1182,7 @@ class TubeSyncApp {
         } catch (error) {
             this.showToast('Network error: ' + error.message, 'error');
             // Hide progress and show download button again on error
+            this.formatProgress.delete(this.currentFormatId);
             if (formatItem) {
                 const progressBar = formatItem.querySelector('.format-progress');
                 const downloadBtn = formatItem.querySelector('.download-btn');
@@ -904,10 +1294,12 @@ class TubeSyncApp {
                 if (response.ok) {
                     this.updateInlineProgress(progress);
                     
-                    if (progress.status === 'completed' || progress.status === 'error') {
+                    if (['completed', 'completed_with_errors', 'error', 'cancelled'].includes(progress.status)) {
                         console.log('Download finished with status:', progress.status);
                         this.stopProgressTracking();
-                        if (progress.status === 'completed') {
+                        if (progress.status === 'cancelled') {
+                            this.showToast('Download cancelled', 'info');
+                        } else if (progress.status !== 'error') {
                             this.loadDownloads(); // Refresh downloads list
                         }
                     }
@@ -919,21 +1311,24 @@ class TubeSyncApp {
     }
 
     updateInlineProgress(progress) {
-        console.log('Updating inline progress:', progress);
-        
-        // Find the format item that's being downloaded
-        const formatItem = document.querySelector(`[data-format-id="${this.currentFormatId}"]`);
-        if (!formatItem) {
-            console.error('Format item not found for:', this.currentFormatId);
-            return;
+        // Remember the state so a recycled row can redraw it when scrolled back
+        this.formatProgress.set(this.currentFormatId, progress);
+
+        // Find the format item that's being downloaded (may be scrolled out of view)
+        const formatItem = document.querySelector(`.format-item[data-format-id="${this.currentFormatId}"]`);
+        if (formatItem) {
+            this.applyInlineProgress(formatItem, progress);
+            // Progress and pause/cancel controls change the row height
+            this.formatsList.remeasure();
         }
+    }
 
+    applyInlineProgress(formatItem, progress) {
         const progressBar = formatItem.querySelector('.format-progress');
         const progressFill = formatItem.querySelector('.inline-progress-fill');
         const progressText = formatItem.querySelector('.inline-progress-text');
         const downloadBtn = formatItem.querySelector('.download-btn');
-
-        console.log('Progress elements found:', { progressBar, progressFill, progressText, downloadBtn });
+        const pauseBtn = formatItem.querySelector('.pause-btn');
 
         if (progressBar && progressFill && progressText) {
             // Show progress section
@@ -941,7 +1336,6 @@ class TubeSyncApp {
             
             // Update progress bar with smooth animation
             const progressValue = progress.progress || 0;
-            console.log('Setting progress width to:', progressValue + '%');
             progressFill.style.width = `${progressValue}%`;
             
             // Update progress text
@@ -949,10 +1343,13 @@ class TubeSyncApp {
                 // This is a playlist download
                 let message = progress.message || 'Downloading...';
                 if (progress.current_video && progress.completed_videos !== undefined) {
-                    message += ` (${progress.completed_videos}/${progress.total_videos} completed`;
+                    message += ` (${progress.completed_videos}/${progress.total_videos}${progress.listing ? '+' : ''} completed`;
                     if (progress.failed_videos > 0) {
                         message += `, ${progress.failed_videos} failed`;
                     }
+                    if (progress.retry_count > 0) {
+                        message += `, ${progress.retry_count} retries`;
+                    }
                     message += ')';
                 }
                 progressText.textContent = message;
@@ -973,10 +1370,21 @@ class TubeSyncApp {
             } else if (progress.status === 'error') {
                 progressFill.style.background = 'linear-gradient(135deg, #e57373, #ef5350)';
                 progressText.textContent = 'Download failed';
+            } else if (progress.status === 'cancelled') {
+                progressFill.style.background = 'linear-gradient(135deg, #bdbdbd, #9e9e9e)';
+                progressText.textContent = 'Download cancelled';
+            } else if (progress.status === 'paused' || progress.status === 'waiting_for_space') {
+                progressFill.style.background = 'linear-gradient(135deg, #ffb74d, #ffa726)';
             } else if (progress.status === 'downloading') {
                 // Show downloading status with blue color
                 progressFill.style.background = 'linear-gradient(135deg, #42a5f5, #2196f3)';
             }
+
+            if (pauseBtn) {
+                const paused = progress.status === 'paused';
+                pauseBtn.title = paused ? 'Resume' : 'Pause';
+                pauseBtn.innerHTML = `<i class="fas fa-${paused ? 'play' : 'pause'}"></i>`;
+            }
             
             // Force a repaint to ensure progress bar updates
             progressFill.offsetHeight;
@@ -998,7 +1406,7 @@ class TubeSyncApp {
             // This is a playlist download
             let message = progress.message;
             if (progress.current_video && progress.completed_videos !== undefined) {
-                message += ` (${progress.current_video}/${progress.total_videos} completed`;
+                message += ` (${progress.current_video}/${progress.total_videos}${progress.listing ? '+' : ''} completed`;
                 if (progress.failed_videos > 0) {
                     message += `, ${progress.failed_videos} failed`;
                 }
@@ -1019,6 +1427,7 @@ class TubeSyncApp {
 
         // Reset inline progress bars
         if (this.currentFormatId) {
+            this.formatProgress.delete(this.currentFormatId);
             const formatItem = document.querySelector(`[data-format-id="${this.currentFormatId}"]`);
             if (formatItem) {
                 const progressBar = formatItem.querySelector('.format-progress');
@@ -1035,9 +1444,49 @@ class TubeSyncApp {
         this.currentFormatId = null;
     }
 
-    cancelDownload() {
-        // Note: This would need backend support for actual cancellation
-        this.showToast('Download cancellation not yet implemented', 'error');
+    getClipRange() {
+        // Empty fields mean a full download
+        const start = document.getElementById('clip-start').value.trim();
+        const end = document.getElementById('clip-end').value.trim();
+        if (!start && !end) {
+            return {};
+        }
+        return {
+            start_time: start,
+            end_time: end,
+            frame_accurate: document.getElementById('clip-frame-accurate').checked
+        };
+    }
+
+    async sendJobAction(action) {
+        if (!this.currentDownloadId) {
+            return null;
+        }
+
+        try {
+            const response = await fetch(`/api/jobs/${this.currentDownloadId}/${action}`, { method: 'POST' });
+            const data = await response.json();
+            if (!response.ok) {
+                this.showToast(data.error || `Failed to ${action} download`, 'error');
+                return null;
+            }
+            return data;
+        } catch (error) {
+            this.showToast('Network error: ' + error.message, 'error');
+            return null;
+        }
+    }
+
+    async togglePauseDownload() {
+        const progress = this.formatProgress.get(this.currentFormatId);
+        const action = progress && progress.status === 'paused' ? 'resume' : 'pause';
+        if (await this.sendJobAction(action)) {
+            this.showToast(action === 'pause' ? 'Pausing download...' : 'Resuming download...', 'info');
+        }
+    }
+
+    async cancelDownload() {
+        await this.sendJobAction('cancel');
     }
 
     async loadDownloads() {
@@ -1058,26 +1507,24 @@ class TubeSyncApp {
     }
 
     displayDownloads(files) {
-        const downloadsList = document.getElementById('downloads-list');
-        
-        if (!files || files.length === 0) {
-            downloadsList.innerHTML = '<p>Downloads will appear here after completion</p>';
-            return;
-        }
-        
-        downloadsList.innerHTML = files.map(file => `
-            <div class="download-item">
-                <div class="download-info">
-                    <div class="download-name">${file.name}</div>
-                    <div class="download-size">${this.formatFileSize(file.size)}</div>
-                </div>
-                <div class="download-actions">
-                    <button class="btn btn-secondary btn-sm" onclick="window.open('/downloads/${file.name}', '_blank')">
-                        <i class="fas fa-download"></i> Download
-                    </button>
-                </div>
+        this.downloadsList.setItems(files || []);
+    }
+
+    createDownloadItem(file) {
+        const div = document.createElement('div');
+        div.className = 'download-item';
+        div.innerHTML = `
+            <div class="download-info">
+                <div class="download-name">${file.name}</div>
+                <div class="download-size">${this.formatFileSize(file.size)}</div>
+            </div>
+            <div class="download-actions">
+                <button class="btn btn-secondary btn-sm" onclick="window.open('/downloads/${file.name}', '_blank')">
+                    <i class="fas fa-download"></i> Download
+                </button>
             </div>
-        `).join('');
+        `;
+        return div;
     }
 
     // Utility functions
@@ -1091,6 +1538,14 @@ class TubeSyncApp {
         return youtubePatterns.some(pattern => pattern.test(url));
     }
 
+    isSingleVideoUrl(url) {
+        return this.isValidYouTubeUrl(url) && !/[?&]list=/.test(url);
+    }
+
+    thumbnailUrl(videoId, variant = 'mqdefault') {
+        return `/api/thumb/${encodeURIComponent(videoId)}?variant=${variant}`;
+    }
+
     formatDuration(seconds) {
         if (!seconds) return 'Unknown';
         const hours = Math.floor(seconds / 3600);
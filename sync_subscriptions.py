@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+TubeSync Sync Subscriptions - scheduled incremental mirroring of playlists and channels
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+
+def default_store_path():
+    """Per-user file next to the thumbnail cache"""
+    return os.path.join(os.path.expanduser('~'), '.tubesync', 'subscriptions.json')
+
+class SyncManager:
+    """Saved playlist/channel subscriptions synced on a schedule.
+
+    Each subscription keeps a watermark: the ID of the newest video already
+    synced, plus the IDs of the few synced before it and the newest upload
+    date, so the position survives that video being deleted or made
+    private. A run lists entries only until it reaches one of those and
+    hands the new ones to run_job. Every entry that downloaded, or failed
+    for good (unavailable, permanent), joins the known IDs. Entries that
+    failed for a passing reason (throttled, network) or were never
+    attempted are kept in retry_entries and tried again on the next few
+    runs without holding back the newer videos.
+
+    list_entries(url, known_ids, newest_first, max_entries, since_date)
+    returns new entries oldest first; run_job(subscription, entries)
+    downloads them and returns (download_id, [outcome per entry]), each
+    outcome 'completed', 'pending' or a classify_download_error cause.
+    """
+    # Seconds between checks for due subscriptions
+    CHECK_INTERVAL = 60
+    DEFAULT_INTERVAL_HOURS = 6
+    # Synced video IDs remembered per subscription, newest first
+    RECENT_IDS = 20
+    # Outcomes worth another try, the runs an entry gets and how many are carried
+    RETRY_OUTCOMES = ('pending', 'throttled', 'network')
+    MAX_SYNC_ATTEMPTS = 3
+    MAX_RETRY_ENTRIES = 50
+
+    def __init__(self, list_entries, run_job, store_path=None):
+        self.list_entries = list_entries
+        self.run_job = run_job
+        self.store_path = store_path or default_store_path()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._running = set()  # subscription IDs with a sync in flight
+        self._subscriptions = self._load()
+
+    def _load(self):
+        try:
+            with open(self.store_path, 'r', encoding='utf-8') as f:
+                subscriptions = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        for subscription in subscriptions.values():
+            # Written by older versions while a sync was in flight; that run never finished
+            if subscription.get('last_status') == 'running':
+                subscription['last_status'] = 'interrupted'
+                subscription['next_run'] = 0
+        return subscriptions
+
+    def _save(self):
+        """Write the store atomically (lock held)"""
+        folder = os.path.dirname(self.store_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmp_path = self.store_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._subscriptions, f, indent=2)
+        os.replace(tmp_path, self.store_path)
+
+    def list(self):
+        with self._lock:
+            return [self._view(subscription) for subscription in self._subscriptions.values()]
+
+    def get(self, subscription_id):
+        with self._lock:
+            subscription = self._subscriptions.get(subscription_id)
+            return self._view(subscription) if subscription else None
+
+    def _view(self, subscription):
+        """Copy of a stored subscription plus its in-memory state (lock held)"""
+        return dict(subscription, running=subscription['id'] in self._running)
+
+    def add(self, url, download_path, format_id, download_type='video', interval_hours=None,
+            newest_first=True, max_videos=None):
+        subscription = {
+            'id': uuid.uuid4().hex[:12],
+            'url': url,
+            'download_path': download_path,
+            'format_id': format_id,
+            'download_type': download_type,
+            'interval_hours': interval_hours or self.DEFAULT_INTERVAL_HOURS,
+            'newest_first': newest_first,
+            'max_videos': max_videos,
+            'watermark': None,
+            'recent_ids': [],
+            'retry_entries': [],
+            'watermark_date': None,
+            'created': time.time(),
+            'last_run': None,
+            'next_run': 0,  # first sync on the next check
+            'last_status': None,
+            'last_error': None,
+            'last_new_videos': 0,
+            'last_download_id': None
+        }
+        with self._lock:
+            self._subscriptions[subscription['id']] = subscription
+            self._save()
+        self._wake.set()
+        return dict(subscription)
+
+    def remove(self, subscription_id):
+        with self._lock:
+            if self._subscriptions.pop(subscription_id, None) is None:
+                return False
+            self._save()
+        return True
+
+    def run_now(self, subscription_id):
+        """Make a subscription due immediately; returns False if it does not exist"""
+        with self._lock:
+            subscription = self._subscriptions.get(subscription_id)
+            if subscription is None:
+                return False
+            subscription['next_run'] = 0
+            self._save()
+        self._wake.set()
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='tubesync-sync', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            for subscription_id in self._due():
+                if self._stop.is_set():
+                    break
+                self.run(subscription_id)
+            self._wake.wait(self.CHECK_INTERVAL)
+            self._wake.clear()
+
+    def _due(self):
+        now = time.time()
+        with self._lock:
+            due = [s for s in self._subscriptions.values() if (s.get('next_run') or 0) <= now]
+            return [s['id'] for s in sorted(due, key=lambda s: s.get('next_run') or 0)]
+
+    def run(self, subscription_id):
+        """Sync one subscription now, in the calling thread"""
+        with self._lock:
+            subscription = self._subscriptions.get(subscription_id)
+            if subscription is None or subscription_id in self._running:
+                return None
+            self._running.add(subscription_id)
+            snapshot = dict(subscription)
+
+        try:
+            return self._sync(subscription_id, snapshot)
+        finally:
+            with self._lock:
+                self._running.discard(subscription_id)
+
+    def _sync(self, subscription_id, snapshot):
+        updates = {'last_error': None}
+        try:
+            recent_ids = list(snapshot.get('recent_ids') or [])
+            if snapshot.get('watermark') and snapshot['watermark'] not in recent_ids:
+                recent_ids.insert(0, snapshot['watermark'])
+            watermark_date = snapshot.get('watermark_date')
+            listed = self.list_entries(snapshot['url'], recent_ids, snapshot.get('newest_first', True),
+                                       snapshot.get('max_videos'), watermark_date)
+            updates['last_new_videos'] = len(listed)
+            print(f"Sync {subscription_id}: {len(listed)} new videos since {snapshot.get('watermark')}")
+            # Earlier failures go first; they are older than anything listed now
+            listed_ids = {entry['id'] for entry in listed}
+            entries = [entry for entry in snapshot.get('retry_entries') or [] if entry['id'] not in listed_ids] + listed
+
+            if entries:
+                download_id, results = self.run_job(snapshot, entries)
+                updates['last_download_id'] = download_id
+                results = list(results) + ['pending'] * (len(entries) - len(results))
+                retry_entries = []
+                for entry, outcome in zip(entries, results):
+                    if outcome in self.RETRY_OUTCOMES:
+                        attempts = entry.get('sync_attempts', 0) + 1
+                        if attempts < self.MAX_SYNC_ATTEMPTS:
+                            retry_entries.append(dict(entry, sync_attempts=attempts))
+                            continue
+                        print(f"Sync {subscription_id}: giving up on {entry['id']} after {attempts} runs ({outcome})")
+                    # Done, failed for good or out of attempts: never list it as new again
+                    updates['watermark'] = entry['id']
+                    recent_ids = [entry['id']] + [video_id for video_id in recent_ids if video_id != entry['id']]
+                    if entry.get('upload_date') and entry['upload_date'] > (watermark_date or ''):
+                        watermark_date = entry['upload_date']
+                updates['recent_ids'] = recent_ids[:self.RECENT_IDS]
+                updates['retry_entries'] = retry_entries[-self.MAX_RETRY_ENTRIES:]
+                updates['watermark_date'] = watermark_date
+                updates['last_status'] = 'ok' if all(outcome == 'completed' for outcome in results) else 'partial'
+            else:
+                updates['last_status'] = 'ok'
+        except Exception as e:
+            print(f"Sync {subscription_id} failed: {e}")
+            updates['last_status'] = 'error'
+            updates['last_error'] = str(e)
+
+        now = time.time()
+        updates['last_run'] = now
+        updates['next_run'] = now + snapshot['interval_hours'] * 3600
+        with self._lock:
+            subscription = self._subscriptions.get(subscription_id)
+            if subscription is None:
+                return None  # removed while running
+            subscription.update(updates)
+            self._save()
+            return self._view(subscription)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+TubeSync Thumbnail Cache - size-bounded on-disk cache for YouTube thumbnails
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from contextlib import contextmanager
+
+VIDEO_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{11}$')
+THUMBNAIL_VARIANTS = ('mqdefault', 'hqdefault')
+THUMBNAIL_URL = 'https://i.ytimg.com/vi/{video_id}/{variant}.jpg'
+
+def default_cache_dir():
+    """Per-user cache folder so thumbnails survive across sessions"""
+    return os.path.join(os.path.expanduser('~'), '.tubesync', 'thumbnails')
+
+class ThumbnailCache:
+    """On-disk thumbnail cache with LRU eviction and conditional revalidation.
+
+    Each image is stored as <key>.jpg with a <key>.json sidecar holding the
+    ETag/Last-Modified validators. File mtime records last use, so the LRU
+    order survives restarts. Entries younger than fresh_for are served with
+    no network traffic; older ones are revalidated with a conditional GET
+    and served stale if the network is unavailable.
+
+    get(..., hold=True) keeps the image from being evicted until release()
+    is called, so a file is never removed while it is being sent.
+    """
+    def __init__(self, cache_dir=None, max_bytes=100 * 1024 * 1024, fresh_for=7 * 24 * 3600, timeout=10):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.fresh_for = fresh_for
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._key_locks = {}  # key -> [lock, users]; only keys with a get() in progress
+        self._holds = {}  # key -> number of callers still sending the image
+        self._index = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self.stats = {'hits': 0, 'revalidated': 0, 'fetched': 0, 'evicted': 0}
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        self._load_index()
+
+    def _load_index(self):
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.jpg'):
+                continue
+            try:
+                file_stat = os.stat(os.path.join(self.cache_dir, filename))
+                entries.append((file_stat.st_mtime, filename[:-4], file_stat.st_size))
+            except OSError:
+                continue
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total_bytes += size
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.jpg', base + '.json'
+
+    @contextmanager
+    def _key_lock(self, key):
+        """Per-key lock, dropped again once no caller uses it"""
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def get(self, video_id, variant='mqdefault', hold=False):
+        """Return the local path of the thumbnail, fetching it if needed (None on failure).
+
+        With hold, a returned path stays on disk until release() is called.
+        """
+        if not VIDEO_ID_PATTERN.match(video_id or '') or variant not in THUMBNAIL_VARIANTS:
+            return None
+
+        key = f"{video_id}_{variant}"
+        if not hold:
+            return self._get(key, video_id, variant)
+        with self._lock:
+            self._holds[key] = self._holds.get(key, 0) + 1
+        image_path = self._get(key, video_id, variant)
+        if image_path is None:
+            self.release(video_id, variant)
+        return image_path
+
+    def release(self, video_id, variant='mqdefault'):
+        """End a hold taken by get(..., hold=True)"""
+        key = f"{video_id}_{variant}"
+        with self._lock:
+            count = self._holds.get(key, 0) - 1
+            if count > 0:
+                self._holds[key] = count
+            else:
+                self._holds.pop(key, None)
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _get(self, key, video_id, variant):
+        image_path, meta_path = self._paths(key)
+
+        # One fetch per thumbnail at a time; other requests wait for it
+        with self._key_lock(key):
+            meta = self._read_meta(meta_path) if os.path.exists(image_path) else None
+            if meta and time.time() - meta.get('fetched_at', 0) < self.fresh_for:
+                with self._lock:
+                    self.stats['hits'] += 1
+                self._touch(key, image_path)
+                return image_path
+
+            url = THUMBNAIL_URL.format(video_id=video_id, variant=variant)
+            try:
+                return self._fetch(key, url, image_path, meta_path, meta)
+            except Exception as e:
+                print(f"Error fetching thumbnail {key}: {e}")
+                if meta:
+                    # Serve stale rather than nothing
+                    self._touch(key, image_path)
+                    return image_path
+                return None
+
+    def _fetch(self, key, url, image_path, meta_path, meta):
+        headers = {'User-Agent': 'TubeSync'}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout) as response:
+                data = response.read()
+                new_meta = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'fetched_at': time.time()
+                }
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta:
+                meta['fetched_at'] = time.time()
+                self._write_meta(meta_path, meta)
+                with self._lock:
+                    self.stats['revalidated'] += 1
+                self._touch(key, image_path)
+                return image_path
+            raise
+
+        # Write to a temp file first so readers never see a partial image
+        tmp_path = image_path + '.part'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, image_path)
+        self._write_meta(meta_path, new_meta)
+
+        with self._lock:
+            self.stats['fetched'] += 1
+            self._total_bytes += len(data) - self._index.pop(key, 0)
+            self._index[key] = len(data)
+        self._evict()
+        return image_path
+
+    def _touch(self, key, image_path):
+        with self._lock:
+            if key in self._index:
+                self._index.move_to_end(key)
+        try:
+            os.utime(image_path, None)
+        except OSError:
+            pass
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._total_bytes <= self.max_bytes or len(self._index) <= 1:
+                    return
+                # Least recently used image that nobody is being sent
+                key = next((key for key in self._index if key not in self._holds), None)
+                if key is None:
+                    return
+                size = self._index.pop(key)
+                self._total_bytes -= size
+                self.stats['evicted'] += 1
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)